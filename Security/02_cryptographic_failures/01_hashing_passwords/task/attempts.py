@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set
+
+from backoff import backoff_delay
+from user import UserStorage, update_record
+
+
+class AttemptTracker:
+    """
+    Неудачные попытки входа по пользователям в скользящем окне window секунд.
+
+    Хранится только очередь отметок времени на пользователя (не больше max_events),
+    поэтому счёт неудач и задержка не требуют записи в UserStorage. Поля
+    failed_attempts/backoff_seconds у User обновляет persist() — вручную или
+    периодически из фонового потока (start()).
+    """
+
+    def __init__(self, window: float = 900.0, max_events: int = 32,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.window = window
+        self.max_events = max_events
+        self._clock = clock
+        self._events: Dict[str, Deque[float]] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop: Optional[threading.Event] = None
+
+    def _live(self, key: str, now: float) -> Optional[Deque[float]]:
+        q = self._events.get(key)
+        if q is None:
+            return None
+        horizon = now - self.window
+        while q and q[0] <= horizon:
+            q.popleft()
+        if not q:
+            del self._events[key]
+            return None
+        return q
+
+    def record_failure(self, key: str) -> int:
+        with self._lock:
+            now = self._clock()
+            q = self._live(key, now)
+            if q is None:
+                q = self._events[key] = deque(maxlen=self.max_events)
+            q.append(now)
+            self._dirty.add(key)
+            return len(q)
+
+    def failures(self, key: str) -> int:
+        with self._lock:
+            q = self._live(key, self._clock())
+            return len(q) if q else 0
+
+    def backoff(self, key: str) -> float:
+        return backoff_delay(self.failures(key))
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            if self._events.pop(key, None) is not None:
+                self._dirty.add(key)
+
+    def prune(self) -> int:
+        """Удаляет пользователей, у которых в окне не осталось неудач; возвращает, сколько осталось."""
+        with self._lock:
+            now = self._clock()
+            for key in list(self._events):
+                self._live(key, now)
+            return len(self._events)
+
+    def persist(self, storage: UserStorage) -> int:
+        """Переносит текущие счётчики изменившихся пользователей в их записи."""
+        with self._lock:
+            now = self._clock()
+            dirty = {key: len(self._live(key, now) or ()) for key in self._dirty}
+            self._dirty.clear()
+        saved = 0
+        for key, n in dirty.items():
+            def counters(rec: Dict, n: int = n) -> Dict:
+                # остальные поля не трогаем: хэш мог смениться после входа
+                rec["failed_attempts"] = n
+                rec["backoff_seconds"] = backoff_delay(n)
+                return rec
+
+            if update_record(storage, key, counters) is not None:
+                saved += 1
+        return saved
+
+    def start(self, storage: UserStorage, interval: float = 5.0) -> None:
+        """Периодически вызывает prune() и persist(storage) в фоновом потоке."""
+        if self._stop is not None:
+            return
+        stop = self._stop = threading.Event()
+
+        def loop() -> None:
+            while not stop.wait(interval):
+                self.prune()
+                self.persist(storage)
+
+        threading.Thread(target=loop, name="attempt-tracker", daemon=True).start()
+
+    def stop(self, storage: Optional[UserStorage] = None) -> None:
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+        if storage is not None:
+            self.persist(storage)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._events)
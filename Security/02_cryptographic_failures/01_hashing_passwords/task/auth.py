@@ -1,33 +1,166 @@
-import hashlib
+import asyncio
+import secrets
 import time
-from validation import validate_password
-from user import User, UserStorage
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from validation import is_breached
+from user import User, UserStorage, update_record
+from backoff import BackoffScheduler, backoff_delay, get_scheduler
+from hashing import hash_password, verify_password
+from attempts import AttemptTracker
+
+# Если задан, неудачи считает трекер в памяти, а не запись пользователя (см. set_attempt_tracker).
+attempt_tracker: Optional[AttemptTracker] = None
+
+
+def set_attempt_tracker(tracker: Optional[AttemptTracker]) -> None:
+    """
+    Переключает учёт неудач на AttemptTracker: во время перебора паролей записи
+    пользователей не перезаписываются, backoff_seconds в них обновляет tracker.persist().
+    """
+    global attempt_tracker
+    attempt_tracker = tracker
+
+
+# argon2-хэш случайного пароля: вход под несуществующим именем тратит столько же времени
+_dummy_hash: Optional[str] = None
+
+
+def _dummy_password_hash() -> str:
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_urlsafe(16))
+    return _dummy_hash
+
+
+@dataclass
+class LoginAttempt:
+    ok: bool
+    retry_after: float = 0.0
+    throttled: bool = False
 
 
 def register_user(storage: UserStorage, username: str, email: str, password: str) -> User:
     """
-    Создает пользователя и сохраняет хэш пароля в виде md5.
-    ВАЖНО: md5 используется ИСКЛЮЧИТЕЛЬНО как учебный старт.
-    Далее это будет мигрировано на Argon2/bcrypt.
+    Создает пользователя и сохраняет хэш пароля argon2.
     """
     if User.exists(storage, username):
         raise ValueError("Пользователь с таким username уже существует")
 
-    validate_password(password)
+    # длину и классы символов проверяет validate_password на стороне формы,
+    # здесь — только отказ для паролей из базы утечек
+    if is_breached(password):
+        raise ValueError("Пароль найден в базе утёкших паролей")
 
-    md5_hex = hashlib.md5(password.encode("utf-8")).hexdigest()
-    user = User(username=username, email=email, password_hash=md5_hex)
-    user.save(storage)
+    user = User(username=username, email=email, password_hash=hash_password(password))
+    insert = getattr(storage, "insert_user", None)
+    if insert is None:
+        user.save(storage)
+    elif not insert(user.to_record()):
+        # параллельная регистрация того же имени успела раньше
+        raise ValueError("Пользователь с таким username уже существует")
     return user
 
 
-def verify_credentials(storage: UserStorage, username: str, password: str) -> bool:
+def _attempt(storage: UserStorage, username: str, password: str) -> Tuple[bool, float]:
     """
-    Возвращает True, если пользователь существует и md5(password) совпадает с сохраненным.
+    Проверяет пароль и обновляет счётчик неудач пользователя; устаревший хэш
+    (md5 или argon2(md5)) при успешном входе заменяется на argon2(password).
+    Хэширование идёт вне замков хранилища, под замком — только правка счётчиков.
+    Возвращает (успех, задержка в секундах, которую нужно выдержать перед ответом).
     """
     user = User.load(storage, username)
     if user is None:
-        return False
+        # без проверки хэша ответ для неизвестного имени заметно быстрее — перечисление пользователей
+        verify_password(password, _dummy_password_hash())
+        return False, 0.0
+
+    tracker = attempt_tracker
+    ok, needs_rehash = verify_password(password, user.password_hash)
+    if ok:
+        if tracker is not None:
+            tracker.reset(username)
+        if needs_rehash or user.failed_attempts or user.backoff_seconds:
+            new_hash = hash_password(password) if needs_rehash else None
+
+            def reset(rec: Dict) -> Dict:
+                if new_hash and rec["password_hash"] == user.password_hash:
+                    rec["password_hash"] = new_hash
+                rec["failed_attempts"] = 0
+                rec["backoff_seconds"] = 0.0
+                return rec
+
+            update_record(storage, username, reset)
+        return True, 0.0
+
+    if tracker is not None:
+        return False, backoff_delay(tracker.record_failure(username))
 
-    md5_hex = hashlib.md5(password.encode("utf-8")).hexdigest()
-    return user.password_hash == md5_hex
+    def bump(rec: Dict) -> Dict:
+        rec["failed_attempts"] = rec.get("failed_attempts", 0) + 1
+        rec["backoff_seconds"] = backoff_delay(rec["failed_attempts"])
+        return rec
+
+    rec = update_record(storage, username, bump)
+    return False, rec["backoff_seconds"] if rec else 0.0
+
+
+def verify_credentials(storage: UserStorage, username: str, password: str) -> bool:
+    """
+    Возвращает True, если пользователь существует и пароль совпадает с сохраненным хэшем.
+    После неудачи ответ задерживается на backoff_seconds пользователя (1.5^n + 1).
+    """
+    ok, delay = _attempt(storage, username, password)
+    if delay:
+        time.sleep(delay)
+    return ok
+
+
+def check_credentials(storage: UserStorage, username: str, password: str,
+                      scheduler: Optional[BackoffScheduler] = None) -> LoginAttempt:
+    """
+    Неблокирующий вариант verify_credentials: вместо sleep возвращает retry_after.
+    Пока задержка пользователя не истекла, пароль не проверяется (throttled=True).
+    """
+    if scheduler is None:
+        scheduler = get_scheduler()
+    wait = scheduler.retry_after(username)
+    if wait > 0:
+        return LoginAttempt(ok=False, retry_after=wait, throttled=True)
+
+    ok, delay = _attempt(storage, username, password)
+    if ok:
+        scheduler.clear(username)
+    elif delay:
+        scheduler.penalize(username, delay)
+    return LoginAttempt(ok=ok, retry_after=delay)
+
+
+# username -> asyncio.Lock; запись живёт, пока замок кто-то держит или ждёт
+_async_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+async def verify_credentials_async(storage: UserStorage, username: str, password: str,
+                                   scheduler: Optional[BackoffScheduler] = None) -> bool:
+    """
+    То же, что verify_credentials, но задержка выдерживается через asyncio.sleep
+    и не занимает поток; попытки во время задержки ждут её окончания.
+    Хэширование идёт в пуле потоков и не останавливает цикл событий.
+    """
+    if scheduler is None:
+        scheduler = get_scheduler()
+    lock = _async_locks.get(username)
+    if lock is None:
+        lock = _async_locks[username] = asyncio.Lock()
+    # попытки одного пользователя по очереди: иначе параллельные проверки
+    # проходят retry_after раньше, чем первая неудача назначит задержку
+    async with lock:
+        while True:
+            await scheduler.wait(username)
+            res = await asyncio.to_thread(check_credentials, storage, username, password, scheduler)
+            if not res.throttled:
+                break
+    if not res.ok and res.retry_after:
+        await asyncio.sleep(res.retry_after)
+    return res.ok
@@ -0,0 +1,118 @@
+import asyncio
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+def backoff_delay(failures: int) -> float:
+    """
+    Задержка после n-й подряд неудачной попытки: 1.5^n + 1 секунд, для n == 0 — 0.
+    """
+    if failures <= 0:
+        return 0.0
+    return (1.5 ** failures) + 1.0
+
+
+class TimerWheel:
+    """
+    Хэшированное колесо таймеров: постановка и отмена — O(1), продвижение
+    просматривает только слоты прошедших тиков. Ключ, дедлайн которого
+    дальше одного оборота, остаётся в слоте до нужного круга.
+    """
+
+    def __init__(self, tick: float = 0.1, slots: int = 512, now: float = 0.0) -> None:
+        self.tick = tick
+        self._slots: List[Dict[str, float]] = [{} for _ in range(slots)]
+        self._where: Dict[str, int] = {}
+        self._cursor = int(now / tick)
+
+    def schedule(self, key: str, deadline: float) -> None:
+        self.cancel(key)
+        i = max(math.ceil(deadline / self.tick), self._cursor + 1) % len(self._slots)
+        self._slots[i][key] = deadline
+        self._where[key] = i
+
+    def cancel(self, key: str) -> None:
+        i = self._where.pop(key, None)
+        if i is not None:
+            del self._slots[i][key]
+
+    def advance(self, now: float) -> List[str]:
+        """Возвращает ключи, чей дедлайн наступил к моменту now."""
+        target = int(now / self.tick)
+        # слот текущего, ещё не закончившегося тика тоже смотрим: часть его дедлайнов уже наступила
+        steps = min(target + 1 - self._cursor, len(self._slots))
+        expired: List[str] = []
+        for t in range(target + 2 - steps, target + 2):
+            slot = self._slots[t % len(self._slots)]
+            for key, deadline in list(slot.items()):
+                if deadline <= now:
+                    del slot[key]
+                    del self._where[key]
+                    expired.append(key)
+        self._cursor = max(self._cursor, target)
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+
+class BackoffScheduler:
+    """
+    Дедлайны «не раньше чем» для пользователей, получивших задержку.
+    Вместо time.sleep в потоке запроса отвечает, сколько ещё ждать (retry-after),
+    или ждёт асинхронно; истёкшие записи удаляет колесо таймеров, так что
+    тысячи одновременно приторможенных пользователей стоят одной записи в словаре.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, tick: float = 0.1, slots: int = 512) -> None:
+        self._clock = clock
+        self._deadlines: Dict[str, float] = {}
+        self._wheel = TimerWheel(tick, slots, clock())
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        for key in self._wheel.advance(now):
+            self._deadlines.pop(key, None)
+
+    def penalize(self, key: str, delay: float) -> float:
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            deadline = now + delay
+            self._deadlines[key] = deadline
+            self._wheel.schedule(key, deadline)
+            return delay
+
+    def retry_after(self, key: str) -> float:
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            deadline = self._deadlines.get(key)
+            return max(0.0, deadline - now) if deadline is not None else 0.0
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._deadlines.pop(key, None)
+            self._wheel.cancel(key)
+
+    async def wait(self, key: str) -> None:
+        delay = self.retry_after(key)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(self._clock())
+            return len(self._deadlines)
+
+
+default_scheduler: Optional[BackoffScheduler] = None
+
+
+def get_scheduler() -> BackoffScheduler:
+    global default_scheduler
+    if default_scheduler is None:
+        default_scheduler = BackoffScheduler()
+    return default_scheduler
@@ -0,0 +1,66 @@
+"""
+Пропускная способность verify_credentials из нескольких потоков.
+
+striped — ConcurrentUserStorage: argon2 считается вне замков, под замком сегмента
+только правка счётчиков; global — тот же вход целиком под одним замком (наивная
+защита от гонок). argon2-cffi отпускает GIL, поэтому первый вариант масштабируется
+с числом потоков, а второй — нет.
+
+    python bench/concurrent_verify.py --threads 1 2 4 8 --users 64 --ops 400
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from passlib.context import CryptContext
+
+import auth
+import hashing
+from user import ConcurrentUserStorage
+
+# Облегчённые параметры argon2, чтобы замер шёл секунды; соотношение вариантов то же.
+BENCH_CONTEXT = CryptContext(schemes=["argon2"], argon2__memory_cost=8192, argon2__rounds=2,
+                             argon2__parallelism=1)
+
+
+def run(threads: int, users: int, ops: int, mode: str) -> float:
+    hashing.pwd_context = BENCH_CONTEXT
+    store = ConcurrentUserStorage()
+    for i in range(users):
+        auth.register_user(store, f"user{i}", f"user{i}@example.com", f"Password-{i}!")
+    big_lock = threading.Lock()
+
+    def one(k: int) -> bool:
+        i = k % users
+        if mode == "global":
+            with big_lock:
+                return auth.verify_credentials(store, f"user{i}", f"Password-{i}!")
+        return auth.verify_credentials(store, f"user{i}", f"Password-{i}!")
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        assert all(pool.map(one, range(ops)))
+    return ops / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--users", type=int, default=64)
+    p.add_argument("--ops", type=int, default=400)
+    a = p.parse_args()
+    for n in a.threads:
+        row = {"threads": n}
+        for mode in ("striped", "global"):
+            row[f"{mode}_per_sec"] = round(run(n, a.users, a.ops, mode), 1)
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
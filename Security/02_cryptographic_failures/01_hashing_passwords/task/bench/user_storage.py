@@ -0,0 +1,82 @@
+"""
+InMemoryUserStorage против SqliteUserStorage (с пакетной записью и без) на N пользователях:
+заполнение, get_user, exists и обновление счётчиков неудач, как его делает verify_credentials.
+
+    python bench/user_storage.py --users 100000 --ops 50000
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlite_storage import SqliteUserStorage
+from user import InMemoryUserStorage, User
+
+
+def _timed(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return round(n / (time.perf_counter() - t0))
+
+
+def bench(store, users: int, ops: int, seed: int = 1) -> dict:
+    rnd = random.Random(seed)
+    names = [f"user{i}" for i in range(users)]
+    picks = [rnd.choice(names) for _ in range(ops)]
+
+    def fill():
+        recs = [User(username=name, email=f"{name}@example.com", password_hash="$argon2id$x").to_record()
+                for name in names]
+        save_users = getattr(store, "save_users", None)
+        if save_users is not None:
+            save_users(recs)  # новые пользователи через save_user пишутся каждый своей транзакцией
+        else:
+            for rec in recs:
+                store.save_user(rec)
+
+    def get():
+        for name in picks:
+            store.get_user(name)
+
+    def exists():
+        for name in picks:
+            store.exists(name)
+
+    def fail():
+        for name in picks:
+            u = User.load(store, name)
+            u.failed_attempts += 1
+            u.save(store)
+        getattr(store, "flush", lambda: None)()
+
+    return {
+        "fill_per_sec": _timed(fill, users),
+        "get_per_sec": _timed(get, ops),
+        "exists_per_sec": _timed(exists, ops),
+        "failure_update_per_sec": _timed(fail, ops),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--users", type=int, default=100_000)
+    p.add_argument("--ops", type=int, default=50_000)
+    a = p.parse_args()
+    with tempfile.TemporaryDirectory() as d:
+        stores = {
+            "memory": InMemoryUserStorage(),
+            "sqlite_batched": SqliteUserStorage(Path(d) / "batched.db"),
+            "sqlite_unbatched": SqliteUserStorage(Path(d) / "unbatched.db", batch_size=1),
+        }
+        for name, store in stores.items():
+            print(json.dumps({"store": name, "users": a.users, **bench(store, a.users, a.ops)}))
+            getattr(store, "close", lambda: None)()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Офлайн-проверка пароля по базе утёкших паролей.
+
+Индекс — отсортированные SHA-1 без первых двух байт (суффиксы по 18 байт) и таблица
+на 65536 префиксов со смещениями начала каждой группы. Файл отображается в память
+(mmap) и не читается целиком: поиск — два числа из таблицы и бинарный поиск внутри
+группы, на корпусе в миллиард хэшей это ~15 сравнений.
+
+    MAGIC | count: u64 | fanout: (65536 + 1) * u64 | суффиксы: count * 18 байт
+
+Сборка из дампа (по строке на пароль или формат HIBP "SHA1HEX:count"):
+
+    python breached.py build passwords.txt breached.idx [--format sha1] [--chunk 5000000]
+"""
+import argparse
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Union
+
+
+MAGIC = b"PWNDIDX1"
+PREFIX_BYTES = 2
+SUFFIX_BYTES = 20 - PREFIX_BYTES
+BUCKETS = 1 << (8 * PREFIX_BYTES)
+_U64 = struct.Struct("<Q")
+_FANOUT = struct.Struct(f"<{BUCKETS + 1}Q")
+HEADER_SIZE = len(MAGIC) + _U64.size + _FANOUT.size
+
+
+def sha1(password: str) -> bytes:
+    return hashlib.sha1(password.encode("utf-8")).digest()
+
+
+class BreachedPasswords:
+    def __init__(self, path: Union[str, Path]) -> None:
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # пустой файл
+            self._file.close()
+            raise ValueError(f"{path}: not a breached-passwords index")
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a breached-passwords index")
+        (self.count,) = _U64.unpack_from(self._mm, len(MAGIC))
+
+    def contains_sha1(self, digest: bytes) -> bool:
+        mm = self._mm
+        bucket = int.from_bytes(digest[:PREFIX_BYTES], "big")
+        lo, hi = struct.unpack_from("<2Q", mm, len(MAGIC) + _U64.size + bucket * _U64.size)
+        suffix = digest[PREFIX_BYTES:]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = HEADER_SIZE + mid * SUFFIX_BYTES
+            probe = mm[pos:pos + SUFFIX_BYTES]
+            if probe == suffix:
+                return True
+            if probe < suffix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return False
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_sha1(sha1(password))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "BreachedPasswords":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _digests(lines: Iterable[str], fmt: str) -> Iterator[bytes]:
+    for n, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        if fmt == "sha1":
+            # записи индекса фиксированной ширины: короткий хэш сдвинул бы все следующие
+            digest = line.split(":", 1)[0].strip()
+            try:
+                if len(digest) != 40:
+                    raise ValueError
+                yield bytes.fromhex(digest)
+            except ValueError:
+                raise ValueError(f"line {n}: not a SHA-1 hex digest: {digest[:48]!r}") from None
+        else:
+            yield sha1(line)
+
+
+def _write_run(digests: List[bytes], directory: str) -> str:
+    digests.sort()
+    fd, name = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        f.write(b"".join(digests))
+    return name
+
+
+def _read_run(f: BinaryIO) -> Iterator[bytes]:
+    while True:
+        d = f.read(20)
+        if len(d) < 20:
+            return
+        yield d
+
+
+def build_index(lines: Iterable[str], out: Union[str, Path], fmt: str = "plain", chunk: int = 5_000_000) -> int:
+    """
+    Внешняя сортировка: порции по chunk хэшей сортируются в памяти и пишутся во временные
+    файлы, затем сливаются в индекс с удалением дублей. Возвращает число уникальных хэшей.
+    """
+    out = Path(out)
+    runs: List[str] = []
+    with tempfile.TemporaryDirectory(dir=str(out.parent)) as tmp:
+        buf: List[bytes] = []
+        for d in _digests(lines, fmt):
+            buf.append(d)
+            if len(buf) >= chunk:
+                runs.append(_write_run(buf, tmp))
+                buf = []
+        if buf or not runs:
+            runs.append(_write_run(buf, tmp))
+
+        files = [open(r, "rb") for r in runs]
+        fanout = [0] * (BUCKETS + 1)
+        count = 0
+        partial = out.with_suffix(out.suffix + ".tmp")
+        try:
+            with open(partial, "wb") as f:
+                f.write(bytes(HEADER_SIZE))
+                last = None
+                for d in heapq.merge(*(_read_run(rf) for rf in files)):
+                    if d == last:
+                        continue
+                    last = d
+                    f.write(d[PREFIX_BYTES:])
+                    fanout[int.from_bytes(d[:PREFIX_BYTES], "big") + 1] += 1
+                    count += 1
+                for i in range(BUCKETS):
+                    fanout[i + 1] += fanout[i]
+                f.seek(0)
+                f.write(MAGIC + _U64.pack(count) + _FANOUT.pack(*fanout))
+            os.replace(partial, out)
+        finally:
+            for rf in files:
+                rf.close()
+    return count
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="breached-passwords index")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("source")
+    b.add_argument("index")
+    b.add_argument("--format", choices=["plain", "sha1"], default="plain")
+    b.add_argument("--chunk", type=int, default=5_000_000, help="hashes sorted in memory at once")
+    c = sub.add_parser("check")
+    c.add_argument("index")
+    c.add_argument("password")
+    a = p.parse_args()
+    if a.cmd == "build":
+        with open(a.source, encoding="utf-8", errors="replace") as f:
+            print(build_index(f, a.index, a.format, a.chunk))
+    else:
+        with BreachedPasswords(a.index) as idx:
+            found = a.password in idx
+        print("breached" if found else "not found")
+        raise SystemExit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
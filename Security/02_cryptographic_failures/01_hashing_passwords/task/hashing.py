@@ -0,0 +1,39 @@
+import hashlib
+import re
+from typing import Tuple
+from passlib.context import CryptContext
+
+
+# Вариант 3: argon2. Хэши с префиксом WRAPPED_PREFIX — argon2(md5(password)),
+# полученные массовой миграцией (migration.py) без знания паролей.
+pwd_context = CryptContext(schemes=["argon2"])
+WRAPPED_PREFIX = "md5+"
+_MD5_HEX = re.compile(r"[0-9a-f]{32}")
+
+
+def md5_hex(password: str) -> str:
+    return hashlib.md5(password.encode("utf-8")).hexdigest()
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def is_legacy_md5(password_hash: str) -> bool:
+    return _MD5_HEX.fullmatch(password_hash) is not None
+
+
+def wrap_md5(legacy_hash: str) -> str:
+    return WRAPPED_PREFIX + pwd_context.hash(legacy_hash)
+
+
+def verify_password(password: str, password_hash: str) -> Tuple[bool, bool]:
+    """
+    Проверяет пароль против хэша любого поколения: md5, argon2(md5) или argon2.
+    Возвращает (совпал ли пароль, нужно ли перехэшировать его в чистый argon2).
+    """
+    if is_legacy_md5(password_hash):
+        return password_hash == md5_hex(password), True
+    if password_hash.startswith(WRAPPED_PREFIX):
+        return pwd_context.verify(md5_hex(password), password_hash[len(WRAPPED_PREFIX):]), True
+    return pwd_context.verify(password, password_hash), pwd_context.needs_update(password_hash)
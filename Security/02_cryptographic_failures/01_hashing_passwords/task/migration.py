@@ -0,0 +1,113 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from hashing import is_legacy_md5, wrap_md5
+from user import UserStorage
+
+
+ProgressCallback = Callable[[Dict], None]
+
+
+def _wrap_chunk(items: List[Tuple[str, str]]) -> List[Tuple[str, str, str]]:
+    # выполняется в процессе пула: argon2 — единственная тяжёлая часть миграции
+    return [(username, legacy, wrap_md5(legacy)) for username, legacy in items]
+
+
+def _read_checkpoint(path: Optional[Path]) -> int:
+    if path is None:
+        return 0
+    try:
+        return int(json.loads(path.read_text(encoding="utf-8"))["done"])
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def _write_checkpoint(path: Optional[Path], done: int) -> None:
+    if path is None:
+        return
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps({"done": done}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _chunks(usernames: Iterator[str], size: int) -> Iterator[List[str]]:
+    while True:
+        chunk = list(islice(usernames, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def migrate_legacy_hashes(storage: UserStorage, usernames: Iterable[str], *, workers: Optional[int] = None,
+                          chunk_size: int = 64, checkpoint: Optional[Path] = None,
+                          progress: Optional[ProgressCallback] = None,
+                          total: Optional[int] = None) -> Dict:
+    """
+    Массово оборачивает md5-хэши в argon2(md5) без знания паролей.
+
+    Хэширование идёт в пуле процессов, чтение и запись — в вызывающем процессе,
+    поэтому подходит любая реализация UserStorage. Порции сохраняются по порядку,
+    после каждой в checkpoint пишется число обработанных имён: повторный запуск
+    с тем же списком продолжает с места остановки. Пользователь, успевший за это
+    время войти (и получить чистый argon2), не перезаписывается.
+    """
+    skip = _read_checkpoint(checkpoint)
+    names = iter(usernames)
+    for _ in islice(names, skip):
+        pass
+
+    stats = {"done": skip, "total": total, "migrated": 0, "skipped": 0}
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    pending: Deque[Tuple[int, Future]] = deque()
+    update = getattr(storage, "update_user", None)
+
+    def commit(size: int, fut: Future) -> None:
+        for username, legacy, wrapped in fut.result():
+            if update is not None:
+                swapped = []
+
+                def swap(rec: Dict) -> Dict:
+                    # сравнение и замена под замком хранилища: вход мог заменить хэш после чтения
+                    if rec["password_hash"] == legacy:
+                        rec["password_hash"] = wrapped
+                        swapped.append(True)
+                    return rec
+
+                update(username, swap)
+                ok = bool(swapped)
+            else:
+                rec = storage.get_user(username)
+                ok = rec is not None and rec["password_hash"] == legacy
+                if ok:
+                    storage.save_user(dict(rec, password_hash=wrapped))
+            stats["migrated" if ok else "skipped"] += 1
+        stats["done"] += size
+        _write_checkpoint(checkpoint, stats["done"])
+        if progress is not None:
+            elapsed = time.perf_counter() - started
+            progress(dict(stats, seconds=elapsed, users_per_sec=(stats["done"] - skip) / elapsed if elapsed else 0.0))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunks(names, chunk_size):
+            items = []
+            for username in chunk:
+                rec = storage.get_user(username)
+                if rec is not None and is_legacy_md5(rec["password_hash"]):
+                    items.append((username, rec["password_hash"]))
+            stats["skipped"] += len(chunk) - len(items)
+            pending.append((len(chunk), pool.submit(_wrap_chunk, items)))
+            # ограниченное окно: миллионы имён не держатся в памяти одновременно
+            while len(pending) > workers * 2:
+                commit(*pending.popleft())
+        while pending:
+            commit(*pending.popleft())
+
+    stats["seconds"] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,146 @@
+import atexit
+import sqlite3
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+
+FIELDS = ("username", "email", "password_hash", "failed_attempts", "backoff_seconds")
+# только эти поля verify_credentials меняет на каждой попытке — их запись можно отложить
+COUNTERS = ("failed_attempts", "backoff_seconds")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    failed_attempts INTEGER NOT NULL DEFAULT 0,
+    backoff_seconds REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+# Текст запросов постоянный: sqlite3 держит их скомпилированными в кэше соединения.
+SQL_GET = "SELECT username, email, password_hash, failed_attempts, backoff_seconds FROM users WHERE username = ?"
+SQL_EXISTS = "SELECT 1 FROM users WHERE username = ?"
+SQL_UPSERT = (
+    "INSERT INTO users (username, email, password_hash, failed_attempts, backoff_seconds) "
+    "VALUES (?, ?, ?, ?, ?) ON CONFLICT(username) DO UPDATE SET "
+    "email = excluded.email, password_hash = excluded.password_hash, "
+    "failed_attempts = excluded.failed_attempts, backoff_seconds = excluded.backoff_seconds"
+)
+
+
+def _row(record: Dict) -> tuple:
+    return (
+        record["username"],
+        record["email"],
+        record["password_hash"],
+        record.get("failed_attempts", 0),
+        record.get("backoff_seconds", 0.0),
+    )
+
+
+def _flush_at_exit(ref: "weakref.ref[SqliteUserStorage]") -> None:
+    store = ref()
+    if store is not None:
+        store.close()
+
+
+class SqliteUserStorage:
+    """
+    Реализация UserStorage на SQLite (WAL, таблица с первичным ключом username).
+
+    verify_credentials сохраняет пользователя после каждой попытки, поэтому изменения
+    одних только счётчиков неудач save_user кладёт в буфер; буфер пишется одной
+    транзакцией, когда набралось batch_size записей, по таймеру через flush_interval
+    секунд после первой отложенной записи, в flush()/close() и при выходе процесса.
+    Новые пользователи и смена email или хэша пароля пишутся сразу.
+    Чтения сначала смотрят в буфер. batch_size=1 — запись на каждый save_user.
+    """
+
+    def __init__(self, path: Union[str, Path], batch_size: int = 256, flush_interval: float = 0.05) -> None:
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None,
+                                     cached_statements=16)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Dict] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._closed = False
+        self._lock = threading.RLock()
+        atexit.register(_flush_at_exit, weakref.ref(self))
+
+    def _fetch(self, username: str) -> Optional[Dict]:
+        row = self._conn.execute(SQL_GET, (username,)).fetchone()
+        return dict(zip(FIELDS, row)) if row else None
+
+    def get_user(self, username: str) -> Optional[Dict]:
+        with self._lock:
+            rec = self._pending.get(username)
+            if rec is not None:
+                return dict(rec)
+            return self._fetch(username)
+
+    def exists(self, username: str) -> bool:
+        with self._lock:
+            if username in self._pending:
+                return True
+            return self._conn.execute(SQL_EXISTS, (username,)).fetchone() is not None
+
+    def save_user(self, record: Dict) -> None:
+        with self._lock:
+            name = record["username"]
+            current = self._pending.get(name) or self._fetch(name)
+            self._pending[name] = dict(record)
+            durable = current is None or any(current[f] != record.get(f) for f in FIELDS if f not in COUNTERS)
+            if durable or len(self._pending) >= self.batch_size:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def save_users(self, records: Iterable[Dict]) -> None:
+        with self._lock:
+            for rec in records:
+                self._pending[rec["username"]] = dict(rec)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending or self._closed:
+                return
+            rows = [_row(rec) for rec in self._pending.values()]
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(SQL_UPSERT, rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._pending.clear()
+
+    def usernames(self) -> List[str]:
+        with self._lock:
+            self.flush()
+            return [r[0] for r in self._conn.execute("SELECT username FROM users")]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._closed = True
+            self._conn.close()
+
+    def __enter__(self) -> "SqliteUserStorage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
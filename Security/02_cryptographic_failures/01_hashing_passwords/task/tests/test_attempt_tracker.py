@@ -0,0 +1,81 @@
+import pytest
+import auth
+from attempts import AttemptTracker
+from user import ConcurrentUserStorage, InMemoryUserStorage, User
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingStorage(InMemoryUserStorage):
+    def __init__(self) -> None:
+        super().__init__()
+        self.saves = 0
+
+    def save_user(self, record):
+        self.saves += 1
+        super().save_user(record)
+
+
+def test_sliding_window_expiry():
+    clock = FakeClock()
+    t = AttemptTracker(window=60, clock=clock)
+    assert t.record_failure("a") == 1
+    clock.now = 30
+    assert t.record_failure("a") == 2
+    assert t.backoff("a") == pytest.approx(1.5 ** 2 + 1)
+    clock.now = 61
+    assert t.failures("a") == 1
+    clock.now = 100
+    assert t.failures("a") == 0 and t.backoff("a") == 0.0
+    t.record_failure("b")
+    clock.now = 200
+    assert t.prune() == 0 and len(t) == 0
+
+
+def test_failures_do_not_write_user_record(monkeypatch):
+    monkeypatch.setattr("auth.time.sleep", lambda s: None)
+    store = CountingStorage()
+    auth.register_user(store, "hana", "hana@example.com", "Password123!")
+    tracker = AttemptTracker(max_events=5)
+    auth.set_attempt_tracker(tracker)
+    try:
+        saves = store.saves
+        for _ in range(8):
+            assert auth.verify_credentials(store, "hana", "WRONG") is False
+        assert store.saves == saves
+        assert tracker.failures("hana") == 5  # max_events
+
+        assert tracker.persist(store) == 1
+        u = User.load(store, "hana")
+        assert u.failed_attempts == 5 and u.backoff_seconds == pytest.approx(1.5 ** 5 + 1)
+
+        assert auth.verify_credentials(store, "hana", "Password123!") is True
+        assert tracker.failures("hana") == 0
+        assert User.load(store, "hana").backoff_seconds == 0.0
+    finally:
+        auth.set_attempt_tracker(None)
+
+
+def test_persist_changes_only_counters():
+    class RacingStore(ConcurrentUserStorage):
+        def update_user(self, username, fn):
+            # пока persist() считал счётчики, вход сменил хэш пароля
+            super().update_user(username, lambda r: dict(r, password_hash="new-hash"))
+            return super().update_user(username, fn)
+
+    store = RacingStore()
+    User(username="ivan", email="ivan@example.com", password_hash="old-hash").save(store)
+    tracker = AttemptTracker()
+    tracker.record_failure("ivan")
+    tracker.record_failure("ghost")
+
+    assert tracker.persist(store) == 1
+    u = User.load(store, "ivan")
+    assert (u.password_hash, u.failed_attempts) == ("new-hash", 1)
+    assert not store.exists("ghost")
@@ -0,0 +1,119 @@
+import asyncio
+import time
+import pytest
+import auth
+import backoff
+from backoff import BackoffScheduler, TimerWheel
+from user import InMemoryUserStorage, User
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_timer_wheel_expires_only_due_keys():
+    wheel = TimerWheel(tick=0.1, slots=8, now=0.0)
+    wheel.schedule("a", 0.25)
+    wheel.schedule("b", 5.0)  # дальше одного оборота колеса
+    wheel.schedule("c", 0.3)
+    wheel.cancel("c")
+    assert wheel.advance(0.2) == []
+    assert wheel.advance(0.3) == ["a"]
+    assert wheel.advance(4.9) == []
+    assert wheel.advance(5.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_scheduler_handles_thousands_of_throttled_users():
+    clock = FakeClock()
+    s = BackoffScheduler(clock=clock)
+    for i in range(5000):
+        s.penalize(f"user{i}", backoff.backoff_delay(1 + i % 5))
+    assert len(s) == 5000
+    assert s.retry_after("user0") == pytest.approx(2.5)
+    clock.now += 3.0
+    assert s.retry_after("user0") == 0.0
+    assert s.retry_after("user4") == pytest.approx(backoff.backoff_delay(5) - 3.0)
+    clock.now += 10.0
+    assert len(s) == 0
+
+
+def test_check_credentials_returns_retry_after_without_sleeping(monkeypatch):
+    monkeypatch.setattr("auth.time.sleep", lambda s: pytest.fail("check_credentials must not sleep"))
+    clock = FakeClock()
+    s = BackoffScheduler(clock=clock)
+    store = InMemoryUserStorage()
+    auth.register_user(store, "dave", "dave@example.com", "Password123!")
+
+    res = auth.check_credentials(store, "dave", "WRONG", s)
+    assert (res.ok, res.throttled) == (False, False)
+    assert res.retry_after == pytest.approx(2.5)
+
+    # во время задержки даже верный пароль не проверяется и счётчик не растёт
+    res = auth.check_credentials(store, "dave", "Password123!", s)
+    assert res.throttled and res.retry_after == pytest.approx(2.5)
+    assert User.load(store, "dave").failed_attempts == 1
+
+    clock.now += 2.5
+    assert auth.check_credentials(store, "dave", "Password123!", s).ok is True
+    u = User.load(store, "dave")
+    assert (u.failed_attempts, u.backoff_seconds) == (0, 0.0)
+
+
+def test_async_verify_waits_without_blocking(monkeypatch):
+    clock = FakeClock()
+    s = BackoffScheduler(clock=clock)
+    store = InMemoryUserStorage()
+    auth.register_user(store, "erin", "erin@example.com", "Password123!")
+    slept = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+        clock.now += seconds
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    async def main():
+        return await asyncio.gather(
+            auth.verify_credentials_async(store, "erin", "WRONG", s),
+            auth.verify_credentials_async(store, "erin", "Password123!", s),
+        )
+
+    assert asyncio.run(main()) == [False, True]
+    assert slept[0] == pytest.approx(2.5)
+    assert User.load(store, "erin").backoff_seconds == 0.0
+
+
+def test_async_verify_hashes_off_the_event_loop(monkeypatch):
+    store = InMemoryUserStorage()
+    auth.register_user(store, "fedor", "fedor@example.com", "Password123!")
+    real = auth.verify_password
+
+    def slow_verify(password, password_hash):
+        time.sleep(0.3)  # как дорогой argon2
+        return real(password, password_hash)
+
+    monkeypatch.setattr(auth, "verify_password", slow_verify)
+    ticks = []
+
+    async def ticker(stop):
+        while not stop.is_set():
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        stop = asyncio.Event()
+        t = asyncio.create_task(ticker(stop))
+        ok = await auth.verify_credentials_async(store, "fedor", "Password123!", BackoffScheduler())
+        stop.set()
+        await t
+        return ok
+
+    assert asyncio.run(main()) is True
+    assert len(ticks) >= 10
@@ -0,0 +1,50 @@
+import hashlib
+import pytest
+import auth
+import breached
+import validation
+from user import InMemoryUserStorage
+
+
+@pytest.fixture
+def index(tmp_path):
+    words = [f"leaked-{i}" for i in range(2000)] + ["Password123!", "leaked-7"]
+    path = tmp_path / "breached.idx"
+    # маленькие порции — проверяем слияние нескольких отсортированных прогонов
+    assert breached.build_index(words, path, chunk=300) == 2001
+    with breached.BreachedPasswords(path) as idx:
+        yield idx
+
+
+def test_lookup_in_mapped_index(index):
+    assert len(index) == 2001
+    assert "leaked-0" in index and "leaked-1999" in index and "Password123!" in index
+    assert "leaked-2000" not in index and "" not in index
+
+
+def test_build_from_hibp_sha1_dump(tmp_path):
+    lines = [hashlib.sha1(b"hunter2").hexdigest().upper() + ":17\n", "\n"]
+    path = tmp_path / "hibp.idx"
+    assert breached.build_index(lines, path, fmt="sha1") == 1
+    with breached.BreachedPasswords(path) as idx:
+        assert "hunter2" in idx and "hunter3" not in idx
+
+
+def test_build_rejects_malformed_sha1_lines(tmp_path):
+    good = hashlib.sha1(b"hunter2").hexdigest()
+    for bad in ("abcd:3", good[:39] + ":1", "zz" * 20):
+        with pytest.raises(ValueError, match="line 2"):
+            breached.build_index([good + "\n", bad + "\n"], tmp_path / "bad.idx", fmt="sha1")
+    assert not (tmp_path / "bad.idx").exists()
+
+
+def test_registration_rejects_breached_password(index):
+    validation.set_breached_index(index)
+    try:
+        res = validation.validate_password("Password123!")
+        assert not res.is_valid and res.errors == [validation.ERR_BREACHED]
+        with pytest.raises(ValueError):
+            auth.register_user(InMemoryUserStorage(), "gosha", "gosha@example.com", "Password123!")
+        assert validation.validate_password("Unleaked-pass1").is_valid
+    finally:
+        validation.set_breached_index(None)
@@ -0,0 +1,67 @@
+import hashlib
+import pytest
+import auth
+import hashing
+from migration import migrate_legacy_hashes
+from user import ConcurrentUserStorage, InMemoryUserStorage, User
+
+
+def _legacy_store(n: int) -> InMemoryUserStorage:
+    store = InMemoryUserStorage()
+    for i in range(n):
+        md5_hex = hashlib.md5(f"secret-{i}".encode()).hexdigest()
+        User(username=f"u{i}", email=f"u{i}@example.com", password_hash=md5_hex).save(store)
+    return store
+
+
+def test_bulk_wrap_then_rehash_on_login():
+    store = _legacy_store(6)
+    auth.register_user(store, "modern", "modern@example.com", "Password123!")
+    seen = []
+
+    report = migrate_legacy_hashes(store, store.usernames(), workers=2, chunk_size=2, progress=seen.append)
+    assert (report["migrated"], report["skipped"], report["done"]) == (6, 1, 7)
+    assert [p["done"] for p in seen] == [2, 4, 6, 7]
+    for i in range(6):
+        h = User.load(store, f"u{i}").password_hash
+        assert h.startswith(hashing.WRAPPED_PREFIX)
+        assert not hashing.is_legacy_md5(h)
+
+    assert auth.verify_credentials(store, "u3", "secret-3") is True
+    assert User.load(store, "u3").password_hash.startswith("$argon2")
+
+
+def test_interrupted_migration_resumes_from_checkpoint(tmp_path):
+    store = _legacy_store(5)
+    checkpoint = tmp_path / "migration.json"
+
+    def stop_after_first_chunk(p):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        migrate_legacy_hashes(store, store.usernames(), workers=1, chunk_size=2,
+                              checkpoint=checkpoint, progress=stop_after_first_chunk)
+    wrapped = [u for u in store.usernames() if User.load(store, u).password_hash.startswith(hashing.WRAPPED_PREFIX)]
+    assert wrapped == ["u0", "u1"]
+
+    report = migrate_legacy_hashes(store, store.usernames(), workers=1, chunk_size=2, checkpoint=checkpoint)
+    assert (report["migrated"], report["done"]) == (3, 5)
+    assert all(not hashing.is_legacy_md5(User.load(store, u).password_hash) for u in store.usernames())
+
+
+def test_login_between_read_and_commit_is_not_overwritten():
+    class RacingStore(ConcurrentUserStorage):
+        def update_user(self, username, fn):
+            # вход пользователя успел заменить md5 на argon2, пока шла миграция
+            if username == "u1":
+                super().update_user(username, lambda r: dict(r, password_hash=hashing.hash_password("secret-1")))
+            return super().update_user(username, fn)
+
+    store, legacy = RacingStore(), _legacy_store(3)
+    for u in legacy.usernames():
+        store.save_user(legacy.get_user(u))
+
+    report = migrate_legacy_hashes(store, store.usernames(), workers=1, chunk_size=3)
+    assert (report["migrated"], report["skipped"]) == (2, 1)
+    assert User.load(store, "u1").password_hash.startswith("$argon2")
+    assert auth.verify_credentials(store, "u1", "secret-1") is True
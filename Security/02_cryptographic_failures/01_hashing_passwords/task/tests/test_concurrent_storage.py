@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from passlib.context import CryptContext
+import auth
+import hashing
+from user import ConcurrentUserStorage, User
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    monkeypatch.setattr(hashing, "pwd_context", CryptContext(
+        schemes=["argon2"], argon2__memory_cost=1024, argon2__rounds=1, argon2__parallelism=1))
+    monkeypatch.setattr("auth.time.sleep", lambda s: None)
+
+
+def _race(n, fn):
+    barrier = threading.Barrier(n)
+
+    def go(_):
+        barrier.wait()
+        try:
+            return fn()
+        except ValueError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(go, range(n)))
+
+
+def test_concurrent_registration_of_same_name_has_one_winner():
+    store = ConcurrentUserStorage(stripes=4)
+    results = _race(8, lambda: auth.register_user(store, "ivy", "ivy@example.com", "Password123!"))
+    assert sum(r is not None for r in results) == 1
+    assert store.usernames() == ["ivy"]
+
+
+def test_concurrent_failures_are_not_lost():
+    store = ConcurrentUserStorage(stripes=4)
+    auth.register_user(store, "jack", "jack@example.com", "Password123!")
+
+    def fail_three_times():
+        return [auth.verify_credentials(store, "jack", "WRONG") for _ in range(3)]
+
+    assert not any(any(r) for r in _race(8, fail_three_times))
+    u = User.load(store, "jack")
+    assert u.failed_attempts == 24
+    assert u.backoff_seconds == pytest.approx(1.5 ** 24 + 1)
+
+
+def test_update_user_is_atomic_per_stripe():
+    store = ConcurrentUserStorage(stripes=2)
+    store.save_user({"username": "k", "email": "k@example.com", "password_hash": "h", "failed_attempts": 0})
+
+    def bump(rec):
+        rec["failed_attempts"] += 1
+        return rec
+
+    _race(16, lambda: [store.update_user("k", bump) for _ in range(100)])
+    assert store.get_user("k")["failed_attempts"] == 1600
+    assert store.update_user("missing", bump) is None
+    assert store.insert_user({"username": "k"}) is False
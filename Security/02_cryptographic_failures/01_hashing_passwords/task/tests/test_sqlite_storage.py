@@ -0,0 +1,60 @@
+import sqlite3
+import time
+import auth
+from sqlite_storage import SqliteUserStorage
+from user import User
+
+
+def test_auth_flow_persists_across_reopen(tmp_path, monkeypatch):
+    monkeypatch.setattr("auth.time.sleep", lambda s: None)
+    path = tmp_path / "users.db"
+    with SqliteUserStorage(path) as store:
+        auth.register_user(store, "fedor", "fedor@example.com", "Password123!")
+        assert auth.verify_credentials(store, "fedor", "WRONG") is False
+        assert auth.verify_credentials(store, "fedor", "WRONG") is False
+
+    with SqliteUserStorage(path) as store:
+        u = User.load(store, "fedor")
+        assert (u.failed_attempts, u.backoff_seconds) == (2, 1.5 ** 2 + 1)
+        assert auth.verify_credentials(store, "fedor", "Password123!") is True
+        assert store.exists("fedor") and not store.exists("nobody")
+        assert store.usernames() == ["fedor"]
+
+
+def test_counter_updates_are_batched_but_readable(tmp_path):
+    path = tmp_path / "users.db"
+    store = SqliteUserStorage(path, batch_size=3, flush_interval=3600)
+    other = sqlite3.connect(str(path))
+    count = lambda: other.execute("SELECT count(*) FROM users").fetchone()[0]
+    attempts = lambda name: other.execute("SELECT failed_attempts FROM users WHERE username = ?",
+                                          (name,)).fetchone()[0]
+
+    # новые пользователи сразу видны другим соединениям
+    for i in range(3):
+        User(username=f"u{i}", email=f"u{i}@example.com", password_hash="h").save(store)
+    assert count() == 3
+
+    for i in range(2):
+        User(username=f"u{i}", email=f"u{i}@example.com", password_hash="h", failed_attempts=1).save(store)
+    assert attempts("u1") == 0
+    assert store.get_user("u1")["failed_attempts"] == 1
+
+    # смена хэша пишется сразу (вместе с накопленным буфером)
+    User(username="u0", email="u0@example.com", password_hash="h2", failed_attempts=1).save(store)
+    assert other.execute("SELECT password_hash FROM users WHERE username = 'u0'").fetchone()[0] == "h2"
+    assert attempts("u1") == 1
+    store.close()
+
+
+def test_buffered_counters_flushed_by_timer(tmp_path):
+    path = tmp_path / "users.db"
+    store = SqliteUserStorage(path, flush_interval=0.05)
+    User(username="u", email="u@example.com", password_hash="h").save(store)
+    User(username="u", email="u@example.com", password_hash="h", failed_attempts=4).save(store)
+
+    other = sqlite3.connect(str(path))
+    deadline = time.monotonic() + 5
+    while other.execute("SELECT failed_attempts FROM users").fetchone()[0] != 4:
+        assert time.monotonic() < deadline, "буфер не сброшен по таймеру"
+        time.sleep(0.01)
+    store.close()
@@ -0,0 +1,14 @@
+import auth
+from user import InMemoryUserStorage
+
+
+def test_unknown_user_still_verifies_a_hash(monkeypatch):
+    """
+    Для несуществующего имени тоже проверяется хэш: по времени ответа нельзя узнать, есть ли пользователь.
+    """
+    seen = []
+    real = auth.verify_password
+    monkeypatch.setattr(auth, "verify_password", lambda p, h: seen.append(h) or real(p, h))
+
+    assert auth.verify_credentials(InMemoryUserStorage(), "ghost", "Password123!") is False
+    assert seen == [auth._dummy_password_hash()]
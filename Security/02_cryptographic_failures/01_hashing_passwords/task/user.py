@@ -1,6 +1,8 @@
 # user.py
+import threading
+import zlib
 from dataclasses import dataclass
-from typing import Protocol, Optional, Dict
+from typing import Callable, Protocol, Optional, Dict, List
 
 
 class UserStorage(Protocol):
@@ -14,13 +16,20 @@ class User:
     username: str
     email: str
     password_hash: str
+    failed_attempts: int = 0
+    backoff_seconds: float = 0.0
 
-    def save(self, storage: UserStorage) -> None:
-        storage.save_user({
+    def to_record(self) -> Dict:
+        return {
             "username": self.username,
             "email": self.email,
             "password_hash": self.password_hash,
-        })
+            "failed_attempts": self.failed_attempts,
+            "backoff_seconds": self.backoff_seconds,
+        }
+
+    def save(self, storage: UserStorage) -> None:
+        storage.save_user(self.to_record())
 
     @classmethod
     def load(cls, storage: UserStorage, username: str) -> Optional["User"]:
@@ -34,6 +43,21 @@ class User:
         return storage.exists(username)
 
 
+def update_record(storage: UserStorage, username: str, fn: Callable[[Dict], Dict]) -> Optional[Dict]:
+    """
+    Чтение-изменение-запись записи пользователя; атомарно, если хранилище умеет update_user.
+    """
+    update = getattr(storage, "update_user", None)
+    if update is not None:
+        return update(username, fn)
+    rec = storage.get_user(username)
+    if rec is None:
+        return None
+    rec = fn(dict(rec))
+    storage.save_user(rec)
+    return rec
+
+
 class InMemoryUserStorage:
     """Учебное хранилище на словаре."""
     def __init__(self) -> None:
@@ -47,3 +71,65 @@ class InMemoryUserStorage:
 
     def exists(self, username: str) -> bool:
         return username in self._db
+
+    def usernames(self) -> List[str]:
+        return list(self._db)
+
+
+class ConcurrentUserStorage:
+    """
+    Потокобезопасное хранилище в памяти с разбиением блокировок по username:
+    пользователи распределены по stripes сегментам, у каждого свой словарь и
+    свой замок, поэтому входы разных пользователей не ждут друг друга.
+
+    Кроме протокола UserStorage есть атомарные insert_user (вставка, если имени
+    ещё нет) и update_user (чтение-изменение-запись под замком сегмента) —
+    auth использует их, чтобы регистрация и счётчики неудач не терялись в гонках.
+    """
+    def __init__(self, stripes: int = 64) -> None:
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._shards: List[Dict[str, Dict]] = [{} for _ in range(stripes)]
+
+    def _stripe(self, username: str) -> int:
+        return zlib.crc32(username.encode("utf-8")) % len(self._locks)
+
+    def get_user(self, username: str) -> Optional[Dict]:
+        i = self._stripe(username)
+        with self._locks[i]:
+            rec = self._shards[i].get(username)
+            return dict(rec) if rec is not None else None
+
+    def save_user(self, record: Dict) -> None:
+        i = self._stripe(record["username"])
+        with self._locks[i]:
+            self._shards[i][record["username"]] = dict(record)
+
+    def exists(self, username: str) -> bool:
+        i = self._stripe(username)
+        with self._locks[i]:
+            return username in self._shards[i]
+
+    def insert_user(self, record: Dict) -> bool:
+        i = self._stripe(record["username"])
+        with self._locks[i]:
+            if record["username"] in self._shards[i]:
+                return False
+            self._shards[i][record["username"]] = dict(record)
+            return True
+
+    def update_user(self, username: str, fn: Callable[[Dict], Dict]) -> Optional[Dict]:
+        """fn получает копию записи и возвращает новую; выполняется под замком — без хэширования внутри."""
+        i = self._stripe(username)
+        with self._locks[i]:
+            rec = self._shards[i].get(username)
+            if rec is None:
+                return None
+            rec = self._shards[i][username] = dict(fn(dict(rec)))
+            return dict(rec)
+
+    def usernames(self) -> List[str]:
+        names: List[str] = []
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                names.extend(shard)
+        return names
@@ -1,10 +1,21 @@
+import os
+import string
 from dataclasses import dataclass, field
+from typing import Optional
 
 
 ERR_LENGTH = "length"
 ERR_LETTER = "requires_letter"
 ERR_DIGIT = "requires_digit"
 ERR_SPECIAL = "requires_special"
+ERR_BREACHED = "breached"
+
+MIN_LENGTH = 12
+
+# Индекс утёкших паролей (breached.py); путь берётся из BREACHED_PASSWORDS_INDEX
+# при первой проверке, либо индекс передаётся явно через set_breached_index().
+_breached = None
+_breached_loaded = False
 
 
 @dataclass
@@ -17,9 +28,43 @@ class PasswordValidationResult:
         return self.is_valid
 
 
+def set_breached_index(index: Optional[object]) -> None:
+    global _breached, _breached_loaded
+    _breached, _breached_loaded = index, True
+
+
+def _breached_index():
+    global _breached, _breached_loaded
+    if not _breached_loaded:
+        path = os.getenv("BREACHED_PASSWORDS_INDEX")
+        if path:
+            from breached import BreachedPasswords
+            _breached = BreachedPasswords(path)
+        _breached_loaded = True
+    return _breached
+
+
+def is_breached(password: str) -> bool:
+    """True, если подключён индекс утёкших паролей и пароль в нём есть."""
+    index = _breached_index()
+    return index is not None and password in index
+
+
 '''
 Требуется проверить минимальную длину пароля (>= 12 символов) и
 наличие в пароле хотя бы одной буквы, цифры и спецсимвола.
+Если подключён индекс утёкших паролей, пароль из него отклоняется (ERR_BREACHED).
 '''
 def validate_password(password: str) -> PasswordValidationResult:
-    return PasswordValidationResult(is_valid=True)
+    errors = []
+    if len(password) < MIN_LENGTH:
+        errors.append(ERR_LENGTH)
+    if not any(c in string.ascii_letters for c in password):
+        errors.append(ERR_LETTER)
+    if not any(c in string.digits for c in password):
+        errors.append(ERR_DIGIT)
+    if all(c.isalnum() or c.isspace() for c in password):
+        errors.append(ERR_SPECIAL)
+    if is_breached(password):
+        errors.append(ERR_BREACHED)
+    return PasswordValidationResult(is_valid=not errors, errors=errors)
@@ -1,17 +1,24 @@
-from typing import Any, Tuple
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Tuple
 from datetime import datetime, timezone
 import storage
 import crypto
+import metrics
 import user
 
-def _tokens_db() -> dict[str, Any]:
-    return storage.load_tokens()
+GC_GRACE_SEC = int(os.getenv("TOKENS_GC_GRACE_SEC", "3600"))
+GC_AUTO_INTERVAL_SEC = int(os.getenv("TOKENS_GC_AUTO_SEC", "0"))
+VERIFY_CACHE_SIZE = int(os.getenv("VERIFY_CACHE_SIZE", "1024"))
 
-def _save_tokens(db: dict[str, Any]) -> None:
-    storage.save_tokens(db)
+# access-токен -> проверенный payload; сбрасывается при смене поколения хранилища токенов
+_verify_cache: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+_verify_cache_gen: Any = None
+# кэш общий для потоков демона
+_verify_lock = threading.Lock()
 
-def record_token(payload: dict[str, Any]) -> None:
-    db = _tokens_db()
+def _token_entry(payload: dict[str, Any], fam: str | None = None) -> dict[str, Any]:
     entry = {
         "jti": payload["jti"],
         "sub": payload["sub"],
@@ -19,75 +26,226 @@ def record_token(payload: dict[str, Any]) -> None:
         "exp": payload["exp"],
         "revoked": False,
     }
-    db["tokens"].append(entry)
-    _save_tokens(db)
+    if fam:
+        # семейство = jti первого refresh-токена сессии, наследуется при каждом refresh
+        entry["fam"] = fam
+    return entry
+
+def record_token(payload: dict[str, Any]) -> None:
+    storage.add_token(_token_entry(payload))
 
 def revoke_by_jti(jti: str) -> None:
-    db = _tokens_db()
-    for t in db["tokens"]:
-        if t["jti"] == jti:
-            t["revoked"] = True
-    _save_tokens(db)
+    storage.revoke_token(jti)
+    _forget_jti(jti)
+
+def revoke_all(sub: str) -> int:
+    """Отзывает все токены пользователя (выход со всех устройств)."""
+    n = storage.revoke_matching(sub=sub)
+    with _verify_lock:
+        _verify_cache.clear()
+    return n
+
+def revoke_family(fam: str) -> int:
+    n = storage.revoke_matching(fam=fam)
+    with _verify_lock:
+        _verify_cache.clear()
+    return n
+
+def sessions(sub: str) -> list[dict[str, Any]]:
+    """Сессии пользователя: токены сгруппированы по семейству refresh-токенов."""
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for t in sorted(storage.find_tokens(sub=sub), key=lambda t: t["exp"]):
+        groups.setdefault(t.get("fam") or t["jti"], []).append(t)
+    return [
+        {
+            "session": fam,
+            "active": any(not t.get("revoked") and not _is_expired(t["exp"]) for t in tokens),
+            "tokens": tokens,
+        }
+        for fam, tokens in groups.items()
+    ]
+
+def _forget_jti(jti: str) -> None:
+    with _verify_lock:
+        for token in [k for k, p in _verify_cache.items() if p["jti"] == jti]:
+            del _verify_cache[token]
+
+def _cached_access_many(tokens: list[str]) -> list[dict[str, Any] | None]:
+    # поколение хранилища проверяется один раз на весь набор (в SQLite это PRAGMA data_version)
+    global _verify_cache_gen
+    gen = storage.generation()
+    results: list[dict[str, Any] | None] = []
+    with _verify_lock:
+        if gen != _verify_cache_gen:
+            _verify_cache.clear()
+            _verify_cache_gen = gen
+        for access in tokens:
+            payload = _verify_cache.get(access)
+            if payload is not None and _is_expired(payload["exp"]):
+                del _verify_cache[access]
+                payload = None
+            if payload is not None:
+                _verify_cache.move_to_end(access)
+                payload = dict(payload)
+            results.append(payload)
+    return results
+
+def _cached_access(access: str) -> dict[str, Any] | None:
+    return _cached_access_many([access])[0]
+
+def _remember_access(access: str, payload: dict[str, Any]) -> None:
+    if VERIFY_CACHE_SIZE <= 0:
+        return
+    with _verify_lock:
+        _verify_cache[access] = dict(payload)
+        while len(_verify_cache) > VERIFY_CACHE_SIZE:
+            _verify_cache.popitem(last=False)
 
 def is_revoked(jti: str) -> bool:
-    db = _tokens_db()
-    for t in db["tokens"]:
-        if t["jti"] == jti:
-            return bool(t.get("revoked"))
-    return False
+    t = storage.get_token(jti)
+    return bool(t and t.get("revoked"))
 
 def _is_expired(exp: int) -> bool:
     return datetime.now(timezone.utc).timestamp() > exp
 
-def login(username: str, password: str) -> Tuple[str, str]:
-    u = user.get_user(username)
-    if not u or not user.verify_password(u, password):
-        raise ValueError("invalid credentials")
-    access, ap = crypto.issue_access(sub=username)
-    refresh, rp = crypto.issue_refresh(sub=username)
-    record_token(rp)
-    record_token(ap)
+def gc(grace_sec: int = GC_GRACE_SEC) -> dict[str, int]:
+    before = int(datetime.now(timezone.utc).timestamp()) - grace_sec
+    removed, reclaimed = storage.purge_expired(before)
+    return {"removed": removed, "bytes": reclaimed}
+
+def _maybe_gc() -> None:
+    if GC_AUTO_INTERVAL_SEC <= 0:
+        return
+    now = datetime.now(timezone.utc).timestamp()
+    try:
+        last = storage.GC_STAMP_PATH.stat().st_mtime
+    except FileNotFoundError:
+        last = 0.0
+    if now - last < GC_AUTO_INTERVAL_SEC:
+        return
+    storage.GC_STAMP_PATH.touch()
+    gc()
+
+def _issue_pair(batch: storage.TokenBatch, sub: str, fam: str | None = None) -> Tuple[str, str]:
+    access, ap = crypto.issue_access(sub=sub)
+    refresh, rp = crypto.issue_refresh(sub=sub)
+    fam = fam or rp["jti"]
+    batch.add(_token_entry(rp, fam))
+    batch.add(_token_entry(ap, fam))
     return access, refresh
 
-def verify_access(access: str) -> dict[str, Any]:
-    payload = crypto.decode(access)
-    if payload.get("typ") != "access":
+def issue_pairs(subjects: Iterable[str]) -> list[Tuple[str, str]]:
+    with storage.tokens_batch() as batch:
+        pairs = [_issue_pair(batch, sub) for sub in subjects]
+    return pairs
+
+def start_session(sub: str) -> Tuple[str, str]:
+    with storage.tokens_batch() as batch:
+        access, refresh = _issue_pair(batch, sub)
+    _maybe_gc()
+    return access, refresh
+
+def login(username: str, password: str) -> Tuple[str, str]:
+    with metrics.timer("auth.login"):
+        u = user.get_user(username)
+        if not u or not user.verify_password(u, password):
+            raise ValueError("invalid credentials")
+        return start_session(username)
+
+def _check_payload(payload: dict[str, Any], typ: str, revoked: bool) -> None:
+    if payload.get("typ") != typ:
         raise ValueError("wrong token type")
-    if is_revoked(payload["jti"]):
+    if revoked:
         raise ValueError("token revoked")
     if _is_expired(payload["exp"]):
         raise ValueError("token expired")
-    return payload
+
+def verify_access(access: str) -> dict[str, Any]:
+    with metrics.timer("auth.verify_access"):
+        cached = _cached_access(access)
+        if cached is not None:
+            return cached
+        payload = crypto.decode(access)
+        _check_payload(payload, "access", is_revoked(payload["jti"]))
+        _remember_access(access, payload)
+        return payload
+
+def _decode_many(tokens: list[str]) -> tuple[list[Any], dict[str, dict[str, Any]]]:
+    decoded: list[Any] = []
+    for token in tokens:
+        try:
+            decoded.append(crypto.decode(token))
+        except Exception as e:
+            decoded.append(e)
+    jtis = [p["jti"] for p in decoded if isinstance(p, dict)]
+    return decoded, storage.get_tokens(jtis)
+
+def verify_access_many(tokens: list[str]) -> list[dict[str, Any]]:
+    results: list[Any] = _cached_access_many(tokens)
+    misses = [i for i, r in enumerate(results) if r is None]
+    decoded, known = _decode_many([tokens[i] for i in misses])
+    for i, payload in zip(misses, decoded):
+        try:
+            if isinstance(payload, Exception):
+                raise payload
+            _check_payload(payload, "access", bool(known.get(payload["jti"], {}).get("revoked")))
+            _remember_access(tokens[i], payload)
+            results[i] = payload
+        except Exception as e:
+            results[i] = e
+    return [
+        {"valid": False, "error": str(r)} if isinstance(r, Exception) else {"valid": True, "payload": r}
+        for r in results
+    ]
 
 def refresh_pair(refresh_token: str) -> Tuple[str, str]:
+    with metrics.timer("auth.refresh"):
+        return _refresh_pair(refresh_token)
+
+def _refresh_pair(refresh_token: str) -> Tuple[str, str]:
     payload = crypto.decode(refresh_token)
-    if payload.get("typ") != "refresh":
-        raise ValueError("wrong token type")
-    if is_revoked(payload["jti"]):
+    stored = storage.get_token(payload["jti"]) or {}
+    fam = stored.get("fam") or payload["jti"]
+    revoked = bool(stored.get("revoked"))
+    if revoked and payload.get("typ") == "refresh":
+        # повторное предъявление уже использованного refresh-токена — цепочка скомпрометирована
+        revoke_family(fam)
+    _check_payload(payload, "refresh", revoked)
+    batch = storage.TokenBatch()
+    access, refresh = _issue_pair(batch, payload["sub"], fam)
+    # проверка и отзыв — одна операция хранилища: из двух одновременных refresh выигрывает один
+    if not storage.rotate_token(payload["jti"], batch.adds):
+        revoke_family(fam)
         raise ValueError("token revoked")
-    if _is_expired(payload["exp"]):
-        raise ValueError("token expired")
-    revoke_by_jti(payload["jti"])
-    access, ap = crypto.issue_access(sub=payload["sub"])
-    refresh, rp = crypto.issue_refresh(sub=payload["sub"])
-    record_token(rp)
-    record_token(ap)
+    _maybe_gc()
     return access, refresh
 
 def revoke(token: str) -> None:
     payload = crypto.decode(token)
     revoke_by_jti(payload["jti"])
 
+def _introspection(payload: dict[str, Any], revoked: bool) -> dict[str, Any]:
+    return {
+        "active": (not revoked) and (not _is_expired(payload["exp"])),
+        "sub": payload.get("sub"),
+        "typ": payload.get("typ"),
+        "exp": payload.get("exp"),
+        "jti": payload.get("jti"),
+    }
+
 def introspect(token: str) -> dict[str, Any]:
     try:
         payload = crypto.decode(token)
-        active = (not is_revoked(payload["jti"])) and (not _is_expired(payload["exp"]))
-        return {
-            "active": active,
-            "sub": payload.get("sub"),
-            "typ": payload.get("typ"),
-            "exp": payload.get("exp"),
-            "jti": payload.get("jti"),
-        }
+        return _introspection(payload, is_revoked(payload["jti"]))
     except Exception:
         return {"active": False, "error": "invalid_token"}
+
+def introspect_many(tokens: list[str]) -> list[dict[str, Any]]:
+    decoded, known = _decode_many(tokens)
+    results = []
+    for payload in decoded:
+        if isinstance(payload, dict):
+            results.append(_introspection(payload, bool(known.get(payload["jti"], {}).get("revoked"))))
+        else:
+            results.append({"active": False, "error": "invalid_token"})
+    return results
@@ -0,0 +1,56 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Tuple, TypeVar
+
+import auth
+import user
+
+T = TypeVar("T")
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+
+# bcrypt отпускает GIL, поэтому хэширование параллелится на потоках.
+# Хранилища и кэш verify_access потокобезопасны; отдельный пул ввода-вывода нужен, чтобы
+# чтения и проверки JWT не ждали в очереди за хэшированием.
+_hash_pool: ThreadPoolExecutor | None = None
+_io_pool: ThreadPoolExecutor | None = None
+
+def _pools() -> tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+    global _hash_pool, _io_pool
+    if _hash_pool is None:
+        _hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="auth-hash")
+        _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="auth-io")
+    return _hash_pool, _io_pool
+
+async def _hashing(fn: Callable[..., T], *args: Any) -> T:
+    return await asyncio.get_running_loop().run_in_executor(_pools()[0], fn, *args)
+
+async def _io(fn: Callable[..., T], *args: Any) -> T:
+    return await asyncio.get_running_loop().run_in_executor(_pools()[1], fn, *args)
+
+async def register_user(username: str, email: str, password: str) -> user.User:
+    if await _io(user.user_exists, username):
+        raise ValueError("user exists")
+    ph = await _hashing(user.hash_password, password)
+    return await _io(user.create_user, user.User(username=username, email=email, password_hash=ph))
+
+async def login(username: str, password: str) -> Tuple[str, str]:
+    u = await _io(user.get_user, username)
+    if not u or not await _hashing(user.verify_password, u, password):
+        raise ValueError("invalid credentials")
+    return await _io(auth.start_session, username)
+
+async def verify_access(access: str) -> dict[str, Any]:
+    return await _io(auth.verify_access, access)
+
+async def refresh_pair(refresh_token: str) -> Tuple[str, str]:
+    return await _io(auth.refresh_pair, refresh_token)
+
+def shutdown() -> None:
+    global _hash_pool, _io_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown()
+        _io_pool.shutdown()
+        _hash_pool = _io_pool = None
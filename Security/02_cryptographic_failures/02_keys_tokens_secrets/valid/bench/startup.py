@@ -0,0 +1,87 @@
+"""
+Холодный старт cli.py: для каждой подкоманды запускает `python -X importtime cli.py ...`
+в чистом процессе, суммирует время импорта модулей верхнего уровня и сверяет с бюджетом.
+Лёгкие команды дополнительно не должны загружать PyJWT, passlib и dotenv.
+
+    python bench/startup.py --repeat 5
+    python bench/startup.py --only help introspect-malformed --scale 2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+CLI = ROOT / "cli.py"
+
+HEAVY = ("jwt", "passlib", "dotenv")
+
+# имя: (argv, бюджет на импорты в мс, запрещённые модули)
+COMMANDS: dict[str, tuple[list[str], float, tuple[str, ...]]] = {
+    "help": (["--help"], 80.0, HEAVY),
+    "introspect-malformed": (["introspect", "--token", "not-a-jwt"], 80.0, HEAVY),
+    "stats": (["stats", "--json"], 100.0, HEAVY),
+    "me": (["me", "--access", "a.b.c"], 250.0, ()),
+    "login": (["login", "--username", "nobody", "--password", "x"], 300.0, ()),
+}
+
+def _parse_importtime(stderr: str) -> tuple[float, set[str]]:
+    """Сумма cumulative-времени модулей верхнего уровня (мс) и множество загруженных модулей."""
+    total_us = 0
+    modules: set[str] = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):  # один пробел после '|' — модуль верхнего уровня
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+def measure(argv: list[str], data_dir: str) -> dict:
+    env = dict(os.environ, AUTH_DATA_DIR=data_dir)
+    env.setdefault("JWT_SECRET", "startup-bench-secret-0123456789abcdef")
+    env.pop("AUTH_METRICS", None)
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", str(CLI), *argv],
+                          cwd=tempfile.gettempdir(), env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - t0) * 1000
+    import_ms, modules = _parse_importtime(proc.stderr)
+    return {"wall_ms": wall_ms, "import_ms": import_ms, "modules": modules}
+
+def run(names: list[str] | None = None, repeat: int = 3, scale: float = 1.0) -> list[dict]:
+    report = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        for name in names or list(COMMANDS):
+            argv, budget, forbidden = COMMANDS[name]
+            runs = [measure(argv, data_dir) for _ in range(repeat)]
+            import_ms = statistics.median(r["import_ms"] for r in runs)
+            loaded = sorted(m for m in forbidden if any(x == m or x.startswith(m + ".") for x in runs[0]["modules"]))
+            report.append({
+                "command": name,
+                "import_ms": round(import_ms, 1),
+                "wall_ms": round(statistics.median(r["wall_ms"] for r in runs), 1),
+                "budget_ms": budget * scale,
+                "forbidden_loaded": loaded,
+                "ok": import_ms <= budget * scale and not loaded,
+            })
+    return report
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--only", nargs="+", choices=list(COMMANDS))
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--scale", type=float, default=1.0, help="multiply budgets (slow machines, CI)")
+    a = p.parse_args()
+    report = run(a.only, a.repeat, a.scale)
+    for row in report:
+        print(json.dumps(row))
+    raise SystemExit(0 if all(r["ok"] for r in report) else 1)
+
+if __name__ == "__main__":
+    main()
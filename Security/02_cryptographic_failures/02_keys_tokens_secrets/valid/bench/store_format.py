@@ -0,0 +1,68 @@
+"""
+JSON против двоичного формата (storage_binary) для tokens: размер файла, время загрузки
+и пиковая память при разборе.
+
+    python bench/store_format.py --sizes 10000 100000 1000000 --repeat 3
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import storage
+import storage_binary
+
+def make_tokens(n: int) -> dict:
+    tokens = []
+    for i in range(n):
+        fam = str(uuid.uuid4()) if i % 2 == 0 else tokens[-1]["fam"]
+        tokens.append({"jti": str(uuid.uuid4()), "sub": f"user{i % 1000}", "typ": ("refresh", "access")[i % 2],
+                       "exp": 1_700_000_000 + i, "revoked": i % 7 == 0, "fam": fam})
+    return {"tokens": tokens}
+
+def _measure(path: Path, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        storage._read_db(path)
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    storage._read_db(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"bytes": path.stat().st_size, "load_ms": round(statistics.median(times) * 1000, 1),
+            "peak_mib": round(peak / 2 ** 20, 1)}
+
+def run(sizes: list[int], repeat: int = 3) -> list[dict]:
+    report = []
+    with tempfile.TemporaryDirectory() as d:
+        for n in sizes:
+            db = make_tokens(n)
+            row = {"tokens": n}
+            for fmt, ext in (("json", ".json"), ("binary", ".bin")):
+                path = Path(d) / f"tokens{ext}"
+                storage._atomic_write(path, db)
+                assert storage._read_db(path) == db
+                row[fmt] = _measure(path, repeat)
+            row["size_ratio"] = round(row["json"]["bytes"] / row["binary"]["bytes"], 2)
+            row["load_speedup"] = round(row["json"]["load_ms"] / max(row["binary"]["load_ms"], 0.1), 2)
+            report.append(row)
+    return report
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    p.add_argument("--repeat", type=int, default=3)
+    a = p.parse_args()
+    for row in run(a.sizes, a.repeat):
+        print(json.dumps(row))
+
+if __name__ == "__main__":
+    main()
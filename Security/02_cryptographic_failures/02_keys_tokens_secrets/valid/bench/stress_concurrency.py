@@ -0,0 +1,148 @@
+"""
+Стресс-тест хранилища: N процессов параллельно делают login + цепочку refresh.
+Проверяет, что ни одна запись токена не потеряна и ни один отзыв не пропал,
+и печатает пропускную способность для каждого N. Затем N процессов одновременно
+предъявляют один и тот же refresh-токен: новую пару должен получить не больше чем
+один, а после обнаруженного повтора ни один выданный в гонке refresh не действует.
+
+    python bench/stress_concurrency.py --backend json --workers 1 2 4 8 --iterations 25
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PASSWORD = "Password123!"
+
+def _setup(data_dir: str, backend: str) -> None:
+    os.environ.setdefault("JWT_SECRET", "stress-test-secret-0123456789abcdef")
+    os.environ["AUTH_STORAGE"] = backend
+    os.environ["BCRYPT_ROUNDS"] = "4"  # нагружаем хранилище, а не bcrypt
+    import storage
+    storage.set_data_dir(data_dir)
+
+def _worker(data_dir: str, backend: str, username: str, iterations: int, start, out) -> None:
+    _setup(data_dir, backend)
+    import auth
+    start.wait()  # импорт модулей не входит в замер
+    issued, rotated = [], []
+    _, refresh = auth.login(username, PASSWORD)
+    issued.append(refresh)
+    for _ in range(iterations):
+        rotated.append(refresh)
+        _, refresh = auth.refresh_pair(refresh)
+        issued.append(refresh)
+    out.put({"issued": issued, "rotated": rotated})
+
+def _race_worker(data_dir: str, backend: str, refresh: str, start, out) -> None:
+    _setup(data_dir, backend)
+    import auth
+    start.wait()
+    try:
+        out.put(auth.refresh_pair(refresh)[1])
+    except ValueError:
+        out.put(None)
+
+def _login(data_dir: str, backend: str, username: str) -> str:
+    _setup(data_dir, backend)
+    import auth
+    return auth.login(username, PASSWORD)[1]
+
+def _active(data_dir: str, backend: str, tokens: list[str]) -> int:
+    _setup(data_dir, backend)
+    import auth
+    return sum(auth.introspect(t)["active"] for t in tokens)
+
+def _prepare(data_dir: str, backend: str, names: list[str]) -> None:
+    _setup(data_dir, backend)
+    import user
+    user.import_users([{"username": n, "email": f"{n}@example.com", "password": PASSWORD} for n in names], workers=1)
+
+def _check(data_dir: str, backend: str, results: list[dict]) -> dict:
+    _setup(data_dir, backend)
+    import auth
+    import storage
+    stored = {t["jti"]: t for t in storage.load_tokens()["tokens"]}
+    lost = revoked_lost = 0
+    for r in results:
+        for token in r["issued"]:
+            if auth.introspect(token)["jti"] not in stored:
+                lost += 1
+        for token in r["rotated"]:
+            if auth.introspect(token)["active"]:
+                revoked_lost += 1
+    return {"stored": len(stored), "lost": lost, "lost_revocations": revoked_lost}
+
+def run(workers: int, iterations: int, backend: str, data_dir: str) -> dict:
+    # всё, что трогает хранилище, — в отдельных процессах: вызывающий процесс не меняет своё окружение
+    ctx = mp.get_context("spawn")
+    names = [f"stress{i}" for i in range(workers)]
+    with ctx.Pool(1) as pool:
+        pool.apply(_prepare, (data_dir, backend, names))
+
+    out = ctx.Queue()
+    start = ctx.Barrier(workers + 1)
+    procs = [ctx.Process(target=_worker, args=(data_dir, backend, n, iterations, start, out)) for n in names]
+    for p in procs:
+        p.start()
+    start.wait()
+    started = time.perf_counter()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    ops = workers * (iterations + 1)
+    report = {"backend": backend, "workers": workers, "ops": ops,
+              "seconds": round(elapsed, 3), "ops_per_sec": round(ops / elapsed, 1)}
+    with ctx.Pool(1) as pool:
+        report.update(pool.apply(_check, (data_dir, backend, results)))
+    report["expected"] = workers * 2 * (iterations + 1)
+    return report
+
+def race(workers: int, backend: str, data_dir: str) -> dict:
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        pool.apply(_prepare, (data_dir, backend, ["racer"]))
+        refresh = pool.apply(_login, (data_dir, backend, "racer"))
+
+    out = ctx.Queue()
+    start = ctx.Barrier(workers)
+    procs = [ctx.Process(target=_race_worker, args=(data_dir, backend, refresh, start, out)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    issued = [t for t in (out.get() for _ in procs) if t is not None]
+    for p in procs:
+        p.join()
+    with ctx.Pool(1) as pool:
+        active = pool.apply(_active, (data_dir, backend, issued))
+    return {"backend": backend, "workers": workers, "race_redeemed": len(issued),
+            "race_active": active if workers > 1 else 0}
+
+def main():
+    p = argparse.ArgumentParser(description="auth-cli storage stress test")
+    p.add_argument("--backend", choices=["json", "sqlite", "journal"], default="json")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--iterations", type=int, default=25)
+    a = p.parse_args()
+
+    failed = False
+    for n in a.workers:
+        with tempfile.TemporaryDirectory() as d:
+            rep = run(n, a.iterations, a.backend, d)
+        print(json.dumps(rep))
+        failed |= rep["lost"] > 0 or rep["lost_revocations"] > 0 or rep["stored"] != rep["expected"]
+        with tempfile.TemporaryDirectory() as d:
+            rep = race(n, a.backend, d)
+        print(json.dumps(rep))
+        failed |= rep["race_redeemed"] > 1 or rep["race_active"] > 0
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
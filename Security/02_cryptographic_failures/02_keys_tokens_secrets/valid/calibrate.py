@@ -0,0 +1,65 @@
+import os
+import time
+from typing import Any, Callable, Iterable
+
+from passlib.hash import argon2, bcrypt
+
+SAMPLE_PASSWORD = "Calibrate-Password-123!"
+
+def _measure_ms(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def _report(params: dict[str, Any], ms: float, within_target: bool = True) -> dict[str, Any]:
+    return {"params": params, "ms": round(ms, 2), "logins_per_sec_per_core": round(1000 / ms, 1),
+            "within_target": within_target}
+
+def calibrate_bcrypt(target_ms: float, rounds: Iterable[int] = range(10, 17), repeat: int = 3) -> dict[str, Any]:
+    """
+    Наибольший cost bcrypt, у которого одна проверка пароля укладывается в target_ms.
+    Если не укладывается даже наименьший, возвращает его с within_target=False.
+    """
+    best = None
+    for r in rounds:
+        h = bcrypt.using(rounds=r).hash(SAMPLE_PASSWORD)
+        ms = _measure_ms(lambda: bcrypt.verify(SAMPLE_PASSWORD, h), repeat)
+        if ms > target_ms:
+            return best or _report({"BCRYPT_ROUNDS": r}, ms, within_target=False)
+        best = _report({"BCRYPT_ROUNDS": r}, ms)
+    return best
+
+def calibrate_argon2(target_ms: float, memory_kib: Iterable[int] = (19456, 47104, 65536, 131072),
+                     time_costs: Iterable[int] = (1, 2, 3, 4), repeat: int = 3) -> dict[str, Any] | None:
+    """
+    Самые тяжёлые (memory * time) параметры argon2id в пределах target_ms; None без argon2-cffi.
+    Если не укладываются даже самые лёгкие, возвращает их с within_target=False.
+    """
+    if not argon2.has_backend():
+        return None
+    best, best_cost, lightest = None, 0, None
+    for m in memory_kib:
+        for t in time_costs:
+            handler = argon2.using(memory_cost=m, rounds=t, parallelism=1)
+            h = handler.hash(SAMPLE_PASSWORD)
+            ms = _measure_ms(lambda: handler.verify(SAMPLE_PASSWORD, h), repeat)
+            params = {"ARGON2_MEMORY_KIB": m, "ARGON2_TIME_COST": t, "ARGON2_PARALLELISM": 1}
+            if lightest is None:
+                lightest = _report(params, ms, within_target=False)
+            if ms > target_ms:
+                break
+            if m * t > best_cost:
+                best_cost = m * t
+                best = _report(params, ms)
+    return best or lightest
+
+def calibrate(target_ms: float, schemes: Iterable[str] = ("bcrypt", "argon2")) -> dict[str, Any]:
+    res: dict[str, Any] = {"target_ms": target_ms, "cores": os.cpu_count()}
+    if "bcrypt" in schemes:
+        res["bcrypt"] = calibrate_bcrypt(target_ms)
+    if "argon2" in schemes:
+        res["argon2"] = calibrate_argon2(target_ms)
+    return res
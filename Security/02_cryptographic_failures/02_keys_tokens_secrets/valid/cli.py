@@ -1,11 +1,27 @@
 import argparse
 import json
-import auth
-import user
+import os
+import re
+import sys
+import metrics
+from client import DEFAULT_ADDR
+
+# auth/user тянут PyJWT, passlib и загрузку .env — импортируются только командами,
+# которым нужны; --help, stats и разбор заведомо битого токена обходятся без них.
+_JWT_SHAPE = re.compile(r"^[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+$")
+
+def _auth():
+    import auth
+    return auth
+
+def _user():
+    _auth()  # crypto загружает .env до того, как user прочитает настройки хэширования
+    import user
+    return user
 
 def cmd_login(a):
     try:
-        access, refresh = auth.login(a.username, a.password)
+        access, refresh = _auth().login(a.username, a.password)
         print(json.dumps({"access_token": access, "refresh_token": refresh}))
         return 0
     except Exception as e:
@@ -14,7 +30,7 @@ def cmd_login(a):
 
 def cmd_me(a):
     try:
-        payload = auth.verify_access(a.access)
+        payload = _auth().verify_access(a.access)
         print(json.dumps(payload, ensure_ascii=False))
         return 0
     except Exception as e:
@@ -23,7 +39,7 @@ def cmd_me(a):
 
 def cmd_refresh(a):
     try:
-        access, refresh = auth.refresh_pair(a.refresh)
+        access, refresh = _auth().refresh_pair(a.refresh)
         print(json.dumps({"access_token": access, "refresh_token": refresh}))
         return 0
     except Exception as e:
@@ -32,27 +48,136 @@ def cmd_refresh(a):
 
 def cmd_revoke(a):
     try:
-        auth.revoke(a.token)
+        _auth().revoke(a.token)
         print("OK")
         return 0
     except Exception as e:
         print(f"Ошибка: {e}")
         return 1
 
+def _introspect_stream(lines, chunk: int = 1000) -> None:
+    batch: list[str] = []
+
+    def flush():
+        for res in _auth().introspect_many(batch):
+            sys.stdout.write(json.dumps(res, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+        batch.clear()
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            item = line
+        batch.append(item.get("token", "") if isinstance(item, dict) else str(item))
+        if len(batch) >= chunk:
+            flush()
+    if batch:
+        flush()
+
 def cmd_introspect(a):
-    res = auth.introspect(a.token)
+    if a.stdin:
+        _introspect_stream(sys.stdin)
+        return 0
+    if not _JWT_SHAPE.match(a.token):
+        res = {"active": False, "error": "invalid_token"}
+    else:
+        res = _auth().introspect(a.token)
     print(json.dumps(res, ensure_ascii=False))
     return 0 if res.get("active") else 1
 
+def cmd_gc(a):
+    try:
+        auth = _auth()
+        res = auth.gc(a.grace) if a.grace is not None else auth.gc()
+        print(json.dumps(res))
+        return 0
+    except Exception as e:
+        print(f"Ошибка: {e}")
+        return 1
+
+def cmd_sessions_list(a):
+    try:
+        print(json.dumps(_auth().sessions(a.user), ensure_ascii=False))
+        return 0
+    except Exception as e:
+        print(f"Ошибка: {e}")
+        return 1
+
+def cmd_sessions_revoke(a):
+    try:
+        print(json.dumps({"revoked": _auth().revoke_all(a.user)}))
+        return 0
+    except Exception as e:
+        print(f"Ошибка: {e}")
+        return 1
+
+def cmd_stats(a):
+    if a.reset:
+        metrics.reset()
+        return 0
+    stats = metrics.summary(metrics.snapshot())
+    if a.json:
+        print(json.dumps(stats))
+        return 0
+    if not stats:
+        print("Нет данных: запускайте команды с AUTH_METRICS=1")
+        return 0
+    print(f"{'phase':<20}{'count':>8}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  ms")
+    for phase, s in stats.items():
+        print(f"{phase:<20}{s['count']:>8}" + "".join(
+            f"{s[k]:>10.3f}" for k in ("mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")))
+    return 0
+
+def cmd_store_convert(a):
+    import storage
+    import storage_binary
+    print(json.dumps(storage_binary.convert_dir(storage.DATA_DIR, a.to)))
+    return 0
+
+def cmd_calibrate(a):
+    import calibrate
+    schemes = ("bcrypt", "argon2") if a.scheme == "all" else (a.scheme,)
+    res = calibrate.calibrate(a.target_ms, schemes)
+    print(json.dumps(res, ensure_ascii=False))
+    slow = [s for s in schemes if res.get(s) and not res[s]["within_target"]]
+    for scheme in slow:
+        print(f"Ошибка: {scheme}: даже минимальные параметры дольше {a.target_ms} мс", file=sys.stderr)
+    return 1 if slow else 0
+
+def cmd_serve(a):
+    import daemon
+    daemon.serve(a.addr)
+    return 0
+
 def cmd_users_add(a):
     try:
-        user.register_user(a.username, a.email, a.password)
+        _user().register_user(a.username, a.email, a.password)
         print("OK")
         return 0
     except Exception as e:
         print(f"Ошибка: {e}")
         return 1
 
+def _read_users_file(path: str) -> list[dict]:
+    import csv
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            return list(csv.DictReader(f))
+        return [json.loads(line) for line in f if line.strip()]
+
+def cmd_users_import(a):
+    try:
+        res = _user().import_users(_read_users_file(a.file), workers=a.workers)
+        print(json.dumps(res, ensure_ascii=False))
+        return 0 if not res["errors"] else 1
+    except Exception as e:
+        print(f"Ошибка: {e}")
+        return 1
+
 def build():
     p = argparse.ArgumentParser(description="auth-cli")
     sub = p.add_subparsers(dest="cmd", required=True)
@@ -75,9 +200,45 @@ def build():
     rv.set_defaults(func=cmd_revoke)
 
     it = sub.add_parser("introspect")
-    it.add_argument("--token", required=True)
+    src = it.add_mutually_exclusive_group(required=True)
+    src.add_argument("--token")
+    src.add_argument("--stdin", action="store_true", help="NDJSON: one token (or {\"token\": ...}) per line")
     it.set_defaults(func=cmd_introspect)
 
+    gc = sub.add_parser("gc")
+    gc.add_argument("--grace", type=int, help="seconds past exp to keep tokens")
+    gc.set_defaults(func=cmd_gc)
+
+    ss = sub.add_parser("sessions")
+    ss_sub = ss.add_subparsers(dest="scmd", required=True)
+    sl = ss_sub.add_parser("list")
+    sl.add_argument("--user", required=True)
+    sl.set_defaults(func=cmd_sessions_list)
+    sr = ss_sub.add_parser("revoke", help="revoke every token of the user")
+    sr.add_argument("--user", required=True)
+    sr.set_defaults(func=cmd_sessions_revoke)
+
+    st = sub.add_parser("stats", help="latency per phase, collected with AUTH_METRICS=1")
+    st.add_argument("--json", action="store_true", help="machine-readable dump")
+    st.add_argument("--reset", action="store_true")
+    st.set_defaults(func=cmd_stats)
+
+    so = sub.add_parser("store")
+    so_sub = so.add_subparsers(dest="ocmd", required=True)
+    cv = so_sub.add_parser("convert", help="users/tokens JSON <-> binary (AUTH_STORE_FORMAT)")
+    cv.add_argument("--to", choices=["binary", "json"], required=True)
+    cv.set_defaults(func=cmd_store_convert)
+
+    cb = sub.add_parser("calibrate")
+    cb.add_argument("--target-ms", type=float, default=250.0, help="max time of one password check")
+    cb.add_argument("--scheme", choices=["bcrypt", "argon2", "all"], default="all")
+    cb.set_defaults(func=cmd_calibrate)
+
+    sv = sub.add_parser("serve")
+    sv.add_argument("--addr", default=os.getenv("AUTH_CLI_ADDR", DEFAULT_ADDR),
+                    help="unix socket path or tcp://127.0.0.1:PORT")
+    sv.set_defaults(func=cmd_serve)
+
     ua = sub.add_parser("users")
     ua_sub = ua.add_subparsers(dest="ucmd", required=True)
     add = ua_sub.add_parser("add")
@@ -85,6 +246,10 @@ def build():
     add.add_argument("--email", required=True)
     add.add_argument("--password", required=True)
     add.set_defaults(func=cmd_users_add)
+    imp = ua_sub.add_parser("import")
+    imp.add_argument("--file", required=True, help="users.csv (username,email,password) or users.jsonl")
+    imp.add_argument("--workers", type=int, help="hashing processes (default: cpu count)")
+    imp.set_defaults(func=cmd_users_import)
 
     return p
 
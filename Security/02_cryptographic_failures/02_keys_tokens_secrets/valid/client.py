@@ -0,0 +1,41 @@
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+# Тонкий клиент к `cli.py serve`: только stdlib, без auth/passlib/jwt,
+# поэтому запуск стоит лишь старта интерпретатора.
+
+DEFAULT_ADDR = str(Path(__file__).resolve().parent / "data" / "auth.sock")
+# секрет, который `serve` по TCP создаёт с правами 0600 и требует в каждом запросе
+DEFAULT_TOKEN_FILE = str(Path(__file__).resolve().parent / "data" / "daemon.token")
+
+def parse_addr(addr: str) -> tuple[str, object]:
+    if addr.startswith("tcp://"):
+        host, port = addr[len("tcp://"):].rsplit(":", 1)
+        return "tcp", (host.strip("[]"), int(port))
+    return "unix", addr
+
+def request(argv: list[str], addr: str | None = None, token_file: str | None = None) -> tuple[int, str]:
+    kind, target = parse_addr(addr or os.getenv("AUTH_CLI_ADDR", DEFAULT_ADDR))
+    req: dict[str, object] = {"argv": argv}
+    if kind == "tcp":
+        path = token_file or os.getenv("AUTH_CLI_TOKEN_FILE", DEFAULT_TOKEN_FILE)
+        req["token"] = Path(path).read_text(encoding="utf-8").strip()
+        sock = socket.create_connection(target)
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(target)
+    with sock, sock.makefile("rb") as f:
+        sock.sendall(json.dumps(req).encode("utf-8") + b"\n")
+        resp = json.loads(f.readline())
+    return resp["code"], resp["out"]
+
+def main():
+    code, out = request(sys.argv[1:])
+    sys.stdout.write(out)
+    raise SystemExit(code)
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from typing import Any, Tuple
 from dotenv import load_dotenv
 import jwt
 from datetime import datetime, timedelta, timezone
+import metrics
 
 load_dotenv()
 
@@ -24,14 +25,16 @@ def make_jti() -> str:
 
 def _encode(payload: dict[str, Any]) -> str:
     _require_secret()
-    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+    with metrics.timer("jwt.encode"):
+        return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
 
 def _decode(token: str) -> dict[str, Any]:
     _require_secret()
-    return jwt.decode(
-        token, JWT_SECRET, algorithms=["HS256"],
-        options={"require": ["exp","iat","iss","sub","jti","typ"]}
-    )
+    with metrics.timer("jwt.decode"):
+        return jwt.decode(
+            token, JWT_SECRET, algorithms=["HS256"],
+            options={"require": ["exp","iat","iss","sub","jti","typ"]}
+        )
 
 def issue_access(sub: str, scope: list[str] | None = None) -> Tuple[str, dict[str, Any]]:
     iat = now_utc()
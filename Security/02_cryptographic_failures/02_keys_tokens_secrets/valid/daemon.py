@@ -0,0 +1,152 @@
+import contextlib
+import hmac
+import io
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+
+import cli
+from client import DEFAULT_TOKEN_FILE, parse_addr
+
+LOOPBACK = ("127.0.0.1", "localhost", "::1")
+
+class _ThreadOutput:
+    """
+    sys.stdout/sys.stderr демона: пишет в буфер текущего запроса, если он задан в потоке.
+    Команды выполняются параллельно, а redirect_stdout подменил бы вывод всему процессу.
+    """
+
+    def __init__(self, fallback) -> None:
+        self.fallback = fallback
+        self.local = threading.local()
+
+    def _target(self):
+        buf = getattr(self.local, "buf", None)
+        return self.fallback if buf is None else buf
+
+    def write(self, s: str) -> int:
+        return self._target().write(s)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+_install_lock = threading.Lock()
+
+def _outputs() -> tuple[_ThreadOutput, _ThreadOutput]:
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadOutput):
+            sys.stdout = _ThreadOutput(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadOutput):
+            sys.stderr = _ThreadOutput(sys.stderr)
+        return sys.stdout, sys.stderr
+
+@contextlib.contextmanager
+def _capture(buf: io.StringIO):
+    outs = _outputs()
+    for o in outs:
+        o.local.buf = buf
+    try:
+        yield
+    finally:
+        for o in outs:
+            o.local.buf = None
+
+def dispatch(argv: list[str]) -> tuple[int, str]:
+    # общей блокировки нет: хранилища сами сериализуют изменения, хэширование идёт параллельно
+    out = io.StringIO()
+    with _capture(out):
+        try:
+            args = cli.build().parse_args(argv)
+        except SystemExit as e:
+            return int(e.code or 0), out.getvalue()
+        if args.cmd == "serve" or getattr(args, "stdin", False):
+            print("Ошибка: команда недоступна через сокет")
+            return 2, out.getvalue()
+        code = args.func(args)
+    return code, out.getvalue()
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        secret = getattr(self.server, "secret", None)
+        for line in self.rfile:
+            denied = False
+            try:
+                req = json.loads(line)
+                token = str(req.get("token", "")).encode("utf-8")
+                denied = secret is not None and not hmac.compare_digest(token, secret.encode("utf-8"))
+                code, out = (2, "Ошибка: неверный токен демона\n") if denied else dispatch(req["argv"])
+            except Exception as e:
+                code, out = 1, f"Ошибка: {e}\n"
+            self.wfile.write(json.dumps({"code": code, "out": out}, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+            if denied:
+                return
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    secret: str | None = None
+    token_file: str | None = None
+
+class _Tcp6Server(_TcpServer):
+    address_family = socket.AF_INET6
+
+def _write_secret(path: str) -> str:
+    """Новый секрет для TCP-клиентов; файл доступен только владельцу (0600)."""
+    secret = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)  # O_EXCL ниже: не пишем в файл, подложенный заранее с другими правами
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(secret)
+    return secret
+
+def make_server(addr: str, token_file: str | None = None) -> socketserver.BaseServer:
+    """
+    Unix-сокет защищён правами 0600. Loopback TCP доступен любому локальному пользователю,
+    поэтому каждый запрос по TCP должен нести секрет из token_file (по умолчанию data/daemon.token).
+    """
+    kind, target = parse_addr(addr)
+    if kind == "tcp":
+        if target[0] not in LOOPBACK:
+            raise ValueError("serve слушает только loopback-адрес")
+        server = (_Tcp6Server if ":" in target[0] else _TcpServer)(target, _Handler)
+        server.token_file = token_file or os.getenv("AUTH_CLI_TOKEN_FILE", DEFAULT_TOKEN_FILE)
+        try:
+            server.secret = _write_secret(server.token_file)
+        except BaseException:
+            server.server_close()
+            raise
+        return server
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(target)
+    old = os.umask(0o177)  # сокет доступен только владельцу: через него выдаются токены
+    try:
+        return _UnixServer(target, _Handler)
+    finally:
+        os.umask(old)
+
+def serve(addr: str) -> None:
+    cli._user()  # auth, PyJWT и passlib загружаются при старте, а не на первом запросе
+    server = make_server(addr)
+    print(f"auth-cli: listening on {addr}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        path = addr if parse_addr(addr)[0] == "unix" else server.token_file
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
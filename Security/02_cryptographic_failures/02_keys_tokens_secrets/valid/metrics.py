@@ -0,0 +1,136 @@
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any
+
+# Включается переменной окружения AUTH_METRICS=1. Выключенный таймер — общий nullcontext,
+# так что на горячем пути остаётся одна проверка флага.
+ENABLED = os.getenv("AUTH_METRICS", "") not in ("", "0")
+
+# корзина k: длительность до 2**k мкс (k = 0..30, последняя — до ~18 минут и всё, что дольше)
+BUCKETS = 31
+QUANTILES = (0.5, 0.9, 0.99)
+
+_NULL = nullcontext()
+_lock = threading.Lock()
+_hist: dict[str, dict[str, Any]] = {}
+
+def _empty() -> dict[str, Any]:
+    return {"count": 0, "sum_us": 0.0, "min_us": None, "max_us": 0.0, "buckets": [0] * BUCKETS}
+
+def _bucket(us: float) -> int:
+    return 0 if us <= 1 else min(BUCKETS - 1, math.ceil(math.log2(us)))
+
+def record(phase: str, seconds: float) -> None:
+    us = seconds * 1e6
+    with _lock:
+        h = _hist.get(phase)
+        if h is None:
+            h = _hist[phase] = _empty()
+        h["count"] += 1
+        h["sum_us"] += us
+        h["min_us"] = us if h["min_us"] is None else min(h["min_us"], us)
+        h["max_us"] = max(h["max_us"], us)
+        h["buckets"][_bucket(us)] += 1
+
+class _Timer:
+    __slots__ = ("phase", "t0")
+
+    def __init__(self, phase: str) -> None:
+        self.phase = phase
+
+    def __enter__(self) -> None:
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        record(self.phase, time.perf_counter() - self.t0)
+
+def timer(phase: str) -> Any:
+    """`with metrics.timer("storage.fsync"): ...` — замер фазы, если метрики включены."""
+    return _Timer(phase) if ENABLED else _NULL
+
+def _merge(into: dict[str, dict[str, Any]], other: dict[str, dict[str, Any]]) -> None:
+    for phase, h in other.items():
+        acc = into.setdefault(phase, _empty())
+        acc["count"] += h["count"]
+        acc["sum_us"] += h["sum_us"]
+        if h["min_us"] is not None:
+            acc["min_us"] = h["min_us"] if acc["min_us"] is None else min(acc["min_us"], h["min_us"])
+        acc["max_us"] = max(acc["max_us"], h["max_us"])
+        acc["buckets"] = [a + b for a, b in zip(acc["buckets"], h["buckets"])]
+
+def metrics_path() -> Path:
+    import storage
+    return storage.DATA_DIR / "metrics.json"
+
+def _read(path: Path) -> dict[str, dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def snapshot(path: Path | None = None) -> dict[str, dict[str, Any]]:
+    """Сырые гистограммы: накопленные в файле другими процессами плюс текущий процесс."""
+    raw = _read(path or metrics_path())
+    with _lock:
+        _merge(raw, _hist)
+    return raw
+
+def flush(path: Path | None = None) -> None:
+    """Переносит гистограммы процесса в data/metrics.json (короткоживущие вызовы cli.py)."""
+    import storage
+    with _lock:
+        if not _hist:
+            return
+        local = {k: dict(v, buckets=list(v["buckets"])) for k, v in _hist.items()}
+        _hist.clear()
+    path = path or metrics_path()
+    with storage.file_lock():
+        raw = _read(path)
+        _merge(raw, local)
+        # мимо storage._atomic_write: запись самих метрик не должна попадать в storage.save
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(raw), encoding="utf-8")
+        os.replace(tmp, path)
+
+def reset(path: Path | None = None) -> None:
+    with _lock:
+        _hist.clear()
+    (path or metrics_path()).unlink(missing_ok=True)
+
+def _quantile(h: dict[str, Any], q: float) -> float:
+    rank = q * h["count"]
+    seen = 0
+    for k, n in enumerate(h["buckets"]):
+        seen += n
+        if n and seen >= rank:
+            return min(float(2 ** k), h["max_us"])
+    return h["max_us"]
+
+def summary(raw: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Машиночитаемая сводка в миллисекундах; квантили — верхние границы корзин."""
+    out = {}
+    for phase in sorted(raw):
+        h = raw[phase]
+        if not h["count"]:
+            continue
+        row = {
+            "count": h["count"],
+            "mean_ms": h["sum_us"] / h["count"] / 1000,
+            "min_ms": h["min_us"] / 1000,
+            "max_ms": h["max_us"] / 1000,
+        }
+        for q in QUANTILES:
+            row[f"p{round(q * 100)}_ms"] = _quantile(h, q) / 1000
+        row["buckets_us"] = {str(2 ** k): n for k, n in enumerate(h["buckets"]) if n}
+        out[phase] = row
+    return out
+
+if ENABLED:
+    atexit.register(flush)
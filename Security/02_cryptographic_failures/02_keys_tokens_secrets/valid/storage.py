@@ -1,45 +1,513 @@
 import json
 import os
 import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 BASE_DIR = Path(__file__).resolve().parent
-DATA_DIR = BASE_DIR / "data"
-USERS_PATH = DATA_DIR / "users.json"
-TOKENS_PATH = DATA_DIR / "tokens.json"
+ENV_KEYS = ("AUTH_DATA_DIR", "AUTH_STORE_FORMAT")
+
+def _load_env() -> None:
+    """
+    Настройки ниже читаются при импорте, а storage импортируется раньше crypto с его
+    load_dotenv(), поэтому .env ищется здесь так же — от каталога модуля вверх.
+    Из файла берутся только ENV_KEYS и без python-dotenv: storage импортируют и лёгкие
+    команды CLI (stats через metrics), которым dotenv загружать нельзя. Заданные в
+    окружении значения, как и у load_dotenv, не переопределяются.
+    """
+    if all(k in os.environ for k in ENV_KEYS):
+        return
+    for d in (BASE_DIR, *BASE_DIR.parents):
+        path = d / ".env"
+        if not path.is_file():
+            continue
+        for line in path.read_text(encoding="utf-8").splitlines():
+            key, sep, value = line.strip().removeprefix("export ").partition("=")
+            key, value = key.strip(), value.strip()
+            if sep and key in ENV_KEYS and key not in os.environ:
+                if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+                    value = value[1:-1]
+                os.environ[key] = value
+        return
+
+def _check_format(store_format: str) -> str:
+    if store_format not in ("json", "binary"):
+        raise RuntimeError(f"unknown AUTH_STORE_FORMAT: {store_format}")
+    return store_format
+
+_load_env()
+DATA_DIR = Path(os.getenv("AUTH_DATA_DIR", str(BASE_DIR / "data")))
+# json — читаемые users.json/tokens.json; binary — компактные users.bin/tokens.bin (storage_binary)
+STORE_FORMAT = _check_format(os.getenv("AUTH_STORE_FORMAT", "json"))
+_EXT = ".bin" if STORE_FORMAT == "binary" else ".json"
+USERS_PATH = DATA_DIR / f"users{_EXT}"
+TOKENS_PATH = DATA_DIR / f"tokens{_EXT}"
+SQLITE_PATH = DATA_DIR / "auth.db"
+GC_STAMP_PATH = DATA_DIR / "gc.stamp"
+LOCK_PATH = DATA_DIR / ".lock"
+
+_backend = None
+# file_lock берёт её первой; чтения JsonStorage тоже идут под ней: кэши разобранных файлов
+# меняются на месте, а демон выполняет команды в нескольких потоках
+_process_lock = threading.RLock()
+_lock_state: dict[str, Any] = {"fd": None, "depth": 0}
+
+def set_data_dir(path: Path | str, store_format: str | None = None) -> None:
+    global DATA_DIR, STORE_FORMAT, _EXT, USERS_PATH, TOKENS_PATH
+    global SQLITE_PATH, GC_STAMP_PATH, LOCK_PATH
+    DATA_DIR = Path(path)
+    if store_format is not None:
+        STORE_FORMAT = _check_format(store_format)
+        _EXT = ".bin" if STORE_FORMAT == "binary" else ".json"
+    USERS_PATH = DATA_DIR / f"users{_EXT}"
+    TOKENS_PATH = DATA_DIR / f"tokens{_EXT}"
+    SQLITE_PATH = DATA_DIR / "auth.db"
+    GC_STAMP_PATH = DATA_DIR / "gc.stamp"
+    LOCK_PATH = DATA_DIR / ".lock"
+    set_backend(None)
+
+def _lock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+def _unlock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def file_lock():
+    """
+    Эксклюзивная блокировка data/.lock между процессами (и потоками) на время
+    чтение-изменение-запись. Реентерабельна внутри процесса.
+    """
+    with _process_lock:
+        if _lock_state["depth"] == 0:
+            DATA_DIR.mkdir(parents=True, exist_ok=True)
+            fd = os.open(LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                _lock_fd(fd)
+            except BaseException:
+                os.close(fd)
+                raise
+            _lock_state["fd"] = fd
+        _lock_state["depth"] += 1
+        try:
+            yield
+        finally:
+            _lock_state["depth"] -= 1
+            if _lock_state["depth"] == 0:
+                fd, _lock_state["fd"] = _lock_state["fd"], None
+                _unlock_fd(fd)
+                os.close(fd)
 
 def _ensure_files():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     if not USERS_PATH.exists():
-        USERS_PATH.write_text(json.dumps({"users": []}, ensure_ascii=False, indent=2), encoding="utf-8")
+        USERS_PATH.write_bytes(_encode(USERS_PATH, {"users": []}))
     if not TOKENS_PATH.exists():
-        TOKENS_PATH.write_text(json.dumps({"tokens": []}, ensure_ascii=False, indent=2), encoding="utf-8")
+        TOKENS_PATH.write_bytes(_encode(TOKENS_PATH, {"tokens": []}))
+
+def _encode(path: Path, data: dict[str, Any]) -> bytes:
+    if path.suffix == ".bin":
+        import storage_binary
+        return storage_binary.dumps(data)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
 
 def _atomic_write(path: Path, data: dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with tempfile.NamedTemporaryFile("w", delete=False, dir=str(path.parent), encoding="utf-8") as tmp:
-        json.dump(data, tmp, ensure_ascii=False, indent=2)
-        tmp.flush()
-        os.fsync(tmp.fileno())
-        name = tmp.name
-    os.replace(name, path)
+    with metrics.timer("storage.save"):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        blob = _encode(path, data)
+        with tempfile.NamedTemporaryFile("wb", delete=False, dir=str(path.parent)) as tmp:
+            tmp.write(blob)
+            tmp.flush()
+            with metrics.timer("storage.fsync"):
+                os.fsync(tmp.fileno())
+            name = tmp.name
+        os.replace(name, path)
+
+def _read_db(path: Path) -> Any:
+    with metrics.timer("storage.load"):
+        if path.suffix == ".bin":
+            import storage_binary
+            return storage_binary.read(path)
+        return json.loads(path.read_text(encoding="utf-8"))
+
+def _stamp(path: Path) -> list[int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+def _email_index(db: dict[str, Any]) -> dict[str, int]:
+    index: dict[str, int] = {}
+    for i, rec in enumerate(db["users"]):
+        index.setdefault(rec["email"], i)
+    return index
+
+class TokenGroups:
+    """Индексы sub -> {jti} и семейство refresh-токенов fam -> {jti}."""
+
+    def __init__(self, tokens: Iterable[dict[str, Any]] = ()) -> None:
+        self.by_sub: dict[str, set[str]] = {}
+        self.by_fam: dict[str, set[str]] = {}
+        for t in tokens:
+            self.add(t)
+
+    def add(self, entry: dict[str, Any]) -> None:
+        self.by_sub.setdefault(entry["sub"], set()).add(entry["jti"])
+        if entry.get("fam"):
+            self.by_fam.setdefault(entry["fam"], set()).add(entry["jti"])
+
+    def select(self, sub: str | None = None, fam: str | None = None) -> set[str]:
+        if sub is not None and fam is not None:
+            return self.by_sub.get(sub, set()) & self.by_fam.get(fam, set())
+        if sub is not None:
+            return set(self.by_sub.get(sub, ()))
+        return set(self.by_fam.get(fam, ()))
+
+class JsonStorage:
+    """Хранилище в JSON-файлах data/users.json и data/tokens.json."""
+
+    name = "json"
+
+    def __init__(self) -> None:
+        # Разобранный tokens.json и индекс jti -> позиция.
+        # Действителен, пока не изменилась подпись файла (inode, mtime, size).
+        self._tokens_cache: dict[str, Any] = {"stamp": None, "db": None, "index": None, "groups": None}
+        # То же для users.json: первичный индекс по username, вторичный по email.
+        self._users_cache: dict[str, Any] = {"stamp": None, "db": None, "by_name": None, "by_email": None}
+
+    def _tokens_state(self) -> tuple[dict[str, Any], dict[str, int]]:
+        _ensure_files()
+        stamp = _stamp(TOKENS_PATH)
+        if self._tokens_cache["stamp"] != stamp:
+            db = _read_db(TOKENS_PATH)
+            # индекс строится из уже разобранного файла — это быстрее, чем читать сохранённый
+            index = {t["jti"]: i for i, t in enumerate(db["tokens"])}
+            self._tokens_cache.update(stamp=stamp, db=db, index=index, groups=TokenGroups(db["tokens"]))
+        return self._tokens_cache["db"], self._tokens_cache["index"]
+
+    def _commit_tokens(self, db: dict[str, Any], index: dict[str, int]) -> None:
+        try:
+            _atomic_write(TOKENS_PATH, db)
+        except BaseException:
+            self._tokens_cache["stamp"] = None
+            raise
+        self._tokens_cache.update(stamp=_stamp(TOKENS_PATH), db=db, index=index)
+
+    def _users_state(self) -> tuple[dict[str, Any], dict[str, int], dict[str, int]]:
+        _ensure_files()
+        stamp = _stamp(USERS_PATH)
+        if self._users_cache["stamp"] != stamp:
+            db = _read_db(USERS_PATH)
+            by_name = {rec["username"]: i for i, rec in enumerate(db["users"])}
+            self._users_cache.update(stamp=stamp, db=db, by_name=by_name, by_email=_email_index(db))
+        c = self._users_cache
+        return c["db"], c["by_name"], c["by_email"]
+
+    def _commit_users(self, db: dict[str, Any]) -> None:
+        try:
+            _atomic_write(USERS_PATH, db)
+        except BaseException:
+            self._users_cache["stamp"] = None
+            raise
+        self._users_cache["stamp"] = _stamp(USERS_PATH)
+
+    def load_users(self) -> dict[str, Any]:
+        with _process_lock:
+            _ensure_files()
+            return _read_db(USERS_PATH)
+
+    def save_users(self, db: dict[str, Any]) -> None:
+        with file_lock():
+            _atomic_write(USERS_PATH, db)
+            self._users_cache["stamp"] = None
+
+    def get_user(self, username: str) -> dict[str, Any] | None:
+        with _process_lock:
+            db, by_name, _ = self._users_state()
+            pos = by_name.get(username)
+            return None if pos is None else dict(db["users"][pos])
+
+    def get_user_by_email(self, email: str) -> dict[str, Any] | None:
+        with _process_lock:
+            db, _, by_email = self._users_state()
+            pos = by_email.get(email)
+            return None if pos is None else dict(db["users"][pos])
+
+    def user_exists(self, username: str) -> bool:
+        with _process_lock:
+            return username in self._users_state()[1]
+
+    def insert_user(self, rec: dict[str, Any]) -> bool:
+        return not self.insert_users([rec])
+
+    def upsert_user(self, rec: dict[str, Any]) -> None:
+        with file_lock():
+            db, by_name, by_email = self._users_state()
+            pos = by_name.get(rec["username"])
+            if pos is None:
+                by_name[rec["username"]] = len(db["users"])
+                by_email.setdefault(rec["email"], len(db["users"]))
+                db["users"].append(rec)
+            else:
+                old_email = db["users"][pos]["email"]
+                db["users"][pos] = rec
+                if old_email != rec["email"]:
+                    self._users_cache["by_email"] = _email_index(db)
+            self._commit_users(db)
+
+    def generation(self) -> Any:
+        return tuple(_stamp(TOKENS_PATH) or ())
+
+    def insert_users(self, recs: list[dict[str, Any]]) -> list[str]:
+        with file_lock():
+            db, by_name, by_email = self._users_state()
+            skipped = []
+            for rec in recs:
+                if rec["username"] in by_name:
+                    skipped.append(rec["username"])
+                    continue
+                by_name[rec["username"]] = len(db["users"])
+                by_email.setdefault(rec["email"], len(db["users"]))
+                db["users"].append(rec)
+            if len(skipped) < len(recs):
+                self._commit_users(db)
+            return skipped
+
+    def load_tokens(self) -> dict[str, Any]:
+        with _process_lock:
+            _ensure_files()
+            return _read_db(TOKENS_PATH)
+
+    def save_tokens(self, db: dict[str, Any]) -> None:
+        with file_lock():
+            _atomic_write(TOKENS_PATH, db)
+            self._tokens_cache["stamp"] = None
+
+    def get_token(self, jti: str) -> dict[str, Any] | None:
+        with _process_lock:
+            db, index = self._tokens_state()
+            pos = index.get(jti)
+            return None if pos is None else dict(db["tokens"][pos])
+
+    def get_tokens(self, jtis: list[str]) -> dict[str, dict[str, Any]]:
+        with _process_lock:
+            db, index = self._tokens_state()
+            return {jti: dict(db["tokens"][index[jti]]) for jti in jtis if jti in index}
+
+    def add_token(self, entry: dict[str, Any]) -> None:
+        self.apply_tokens([entry], [])
+
+    def apply_tokens(self, adds: list[dict[str, Any]], revokes: list[str]) -> None:
+        with file_lock():
+            db, index = self._tokens_state()
+            for entry in adds:
+                index[entry["jti"]] = len(db["tokens"])
+                db["tokens"].append(entry)
+                self._tokens_cache["groups"].add(entry)
+            for jti in revokes:
+                pos = index.get(jti)
+                if pos is not None:
+                    db["tokens"][pos]["revoked"] = True
+            self._commit_tokens(db, index)
+
+    def _is_active(self, jti: str) -> bool:
+        db, index = self._tokens_state()
+        pos = index.get(jti)
+        return pos is not None and not db["tokens"][pos].get("revoked")
+
+    def revoke_token(self, jti: str) -> bool:
+        with file_lock():
+            if not self._is_active(jti):
+                return False
+            self.apply_tokens([], [jti])
+            return True
+
+    def rotate_token(self, jti: str, adds: list[dict[str, Any]]) -> bool:
+        with file_lock():
+            if not self._is_active(jti):
+                return False
+            self.apply_tokens(adds, [jti])
+            return True
+
+    def find_tokens(self, sub: str | None = None, fam: str | None = None) -> list[dict[str, Any]]:
+        with _process_lock:
+            db, index = self._tokens_state()
+            positions = sorted(index[jti] for jti in self._tokens_cache["groups"].select(sub, fam))
+            return [dict(db["tokens"][pos]) for pos in positions]
+
+    def revoke_matching(self, sub: str | None = None, fam: str | None = None) -> int:
+        with file_lock():
+            db, index = self._tokens_state()
+            hits = [db["tokens"][index[jti]] for jti in self._tokens_cache["groups"].select(sub, fam)]
+            hits = [t for t in hits if not t.get("revoked")]
+            for t in hits:
+                t["revoked"] = True
+            if hits:
+                self._commit_tokens(db, index)
+            return len(hits)
+
+    def purge_expired(self, before: int) -> tuple[int, int]:
+        with file_lock():
+            db, _ = self._tokens_state()
+            size = _file_size(TOKENS_PATH)
+            keep = [t for t in db["tokens"] if t["exp"] >= before]
+            removed = len(db["tokens"]) - len(keep)
+            if removed:
+                db["tokens"] = keep
+                self._tokens_cache["groups"] = TokenGroups(keep)
+                self._commit_tokens(db, {t["jti"]: i for i, t in enumerate(keep)})
+            return removed, size - _file_size(TOKENS_PATH)
+
+    def clear(self) -> None:
+        with file_lock():
+            DATA_DIR.mkdir(parents=True, exist_ok=True)
+            USERS_PATH.write_bytes(_encode(USERS_PATH, {"users": []}))
+            TOKENS_PATH.write_bytes(_encode(TOKENS_PATH, {"tokens": []}))
+            self._tokens_cache["stamp"] = None
+            self._users_cache["stamp"] = None
+
+class TokenBatch:
+    """Накопленные изменения токенов; применяются одной записью в tokens_batch()."""
+
+    def __init__(self) -> None:
+        self.adds: list[dict[str, Any]] = []
+        self.revokes: list[str] = []
+
+    def add(self, entry: dict[str, Any]) -> None:
+        self.adds.append(entry)
+
+    def revoke(self, jti: str) -> None:
+        self.revokes.append(jti)
+
+def open_backend(name: str):
+    if name == "json":
+        return JsonStorage()
+    if name == "sqlite":
+        from storage_sqlite import SqliteStorage
+        return SqliteStorage(SQLITE_PATH)
+    if name == "journal":
+        from storage_journal import JournalStorage
+        return JournalStorage()
+    raise RuntimeError(f"unknown storage backend: {name} (AUTH_STORAGE)")
+
+def backend():
+    global _backend
+    if _backend is None:
+        _backend = open_backend(os.getenv("AUTH_STORAGE", "json"))
+    return _backend
+
+def set_backend(b) -> None:
+    global _backend
+    _backend = b
 
 def load_users() -> dict[str, Any]:
-    _ensure_files()
-    return json.loads(USERS_PATH.read_text(encoding="utf-8"))
+    return backend().load_users()
 
 def save_users(db: dict[str, Any]) -> None:
-    _atomic_write(USERS_PATH, db)
+    backend().save_users(db)
+
+def get_user(username: str) -> dict[str, Any] | None:
+    return backend().get_user(username)
+
+def get_user_by_email(email: str) -> dict[str, Any] | None:
+    return backend().get_user_by_email(email)
+
+def user_exists(username: str) -> bool:
+    return backend().user_exists(username)
+
+def insert_user(rec: dict[str, Any]) -> bool:
+    """Добавляет пользователя, если username свободен; проверка и запись атомарны."""
+    return backend().insert_user(rec)
+
+def upsert_user(rec: dict[str, Any]) -> None:
+    backend().upsert_user(rec)
+
+def insert_users(recs: list[dict[str, Any]]) -> list[str]:
+    """
+    Добавляет пользователей одной записью. Занятые username (в том числе занятые
+    между проверкой и записью) пропускаются; возвращает их список.
+    """
+    return backend().insert_users(recs)
 
 def load_tokens() -> dict[str, Any]:
-    _ensure_files()
-    return json.loads(TOKENS_PATH.read_text(encoding="utf-8"))
+    return backend().load_tokens()
 
 def save_tokens(db: dict[str, Any]) -> None:
-    _atomic_write(TOKENS_PATH, db)
+    backend().save_tokens(db)
+
+def generation() -> Any:
+    """Значение, меняющееся при любом изменении хранилища токенов (в т.ч. другим процессом)."""
+    return backend().generation()
+
+def get_token(jti: str) -> dict[str, Any] | None:
+    return backend().get_token(jti)
+
+def get_tokens(jtis: list[str]) -> dict[str, dict[str, Any]]:
+    """Известные хранилищу записи для набора jti за одно обращение."""
+    return backend().get_tokens(jtis)
+
+def add_token(entry: dict[str, Any]) -> None:
+    backend().add_token(entry)
+
+def revoke_token(jti: str) -> bool:
+    """Отзывает токен; False, если он неизвестен или уже был отозван."""
+    return backend().revoke_token(jti)
+
+def rotate_token(jti: str, adds: list[dict[str, Any]]) -> bool:
+    """
+    Атомарно отзывает действующий токен jti и записывает adds. Если jti неизвестен
+    или уже отозван (в том числе параллельным вызовом), ничего не пишет и возвращает False.
+    """
+    return backend().rotate_token(jti, adds)
+
+def apply_tokens(adds: list[dict[str, Any]], revokes: list[str]) -> None:
+    backend().apply_tokens(adds, revokes)
+
+@contextmanager
+def tokens_batch():
+    batch = TokenBatch()
+    yield batch
+    if batch.adds or batch.revokes:
+        apply_tokens(batch.adds, batch.revokes)
+
+def find_tokens(sub: str | None = None, fam: str | None = None) -> list[dict[str, Any]]:
+    """Токены пользователя и/или семейства refresh-токенов — без обхода всего хранилища."""
+    return backend().find_tokens(sub, fam)
+
+def revoke_matching(sub: str | None = None, fam: str | None = None) -> int:
+    return backend().revoke_matching(sub, fam)
+
+def purge_expired(before: int) -> tuple[int, int]:
+    return backend().purge_expired(before)
 
 def clear_data():
-    DATA_DIR.mkdir(parents=True, exist_ok=True)    
-    USERS_PATH.write_text(json.dumps({"users": []}, ensure_ascii=False, indent=2), encoding="utf-8")    
-    TOKENS_PATH.write_text(json.dumps({"tokens": []}, ensure_ascii=False, indent=2), encoding="utf-8")
+    backend().clear()
@@ -0,0 +1,110 @@
+"""
+Компактный двоичный формат data/users.bin и data/tokens.bin (AUTH_STORE_FORMAT=binary).
+
+Файл хранит записи по столбцам: строки одного поля склеены через NUL и читаются одним
+decode + split, числа лежат массивами array('q'/'d'/'B'). Без отступов и повторяющихся
+ключей файл примерно вдвое меньше JSON и разбирается быстрее (bench/store_format.py).
+Поля вне SCHEMAS не сохраняются.
+
+    MAGIC | kind: u8 | count: u32 | столбец, ... ; столбец = tag: u8 | size: u32 | данные
+"""
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any
+
+MAGIC = b"AUTHCOL1"
+_HEAD = struct.Struct("<BI")
+_COL = struct.Struct("<BI")
+
+STR, INT, FLOAT, BOOL = 1, 2, 3, 4
+
+# имя ключа верхнего уровня -> (код вида, [(поле, тип)])
+SCHEMAS: dict[str, tuple[int, list[tuple[str, int]]]] = {
+    "users": (1, [("username", STR), ("email", STR), ("password_hash", STR),
+                  ("failed_attempts", INT), ("locked_until", FLOAT)]),
+    "tokens": (2, [("jti", STR), ("sub", STR), ("typ", STR), ("exp", INT),
+                   ("revoked", BOOL), ("fam", STR)]),
+}
+_KINDS = {kind: (key, fields) for key, (kind, fields) in SCHEMAS.items()}
+
+# None хранится как NaN (locked_until); пустой fam означает, что поля в записи не было
+_NAN = float("nan")
+
+def _pack(tag: int, values: list[Any]) -> bytes:
+    if tag == STR:
+        data = "\0".join("" if v is None else v for v in values).encode("utf-8")
+    elif tag == INT:
+        data = array("q", [int(v or 0) for v in values]).tobytes()
+    elif tag == FLOAT:
+        data = array("d", [_NAN if v is None else float(v) for v in values]).tobytes()
+    else:
+        data = bytes(1 if v else 0 for v in values)
+    return _COL.pack(tag, len(data)) + data
+
+def _unpack(tag: int, data: bytes, count: int) -> list[Any]:
+    if tag == STR:
+        return data.decode("utf-8").split("\0") if count else []
+    if tag == BOOL:
+        return [b == 1 for b in data]
+    arr = array("q" if tag == INT else "d")
+    arr.frombytes(data)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    if tag == FLOAT:
+        return [None if v != v else v for v in arr]
+    return arr.tolist()
+
+def dumps(db: dict[str, Any]) -> bytes:
+    (key, records), = db.items()
+    kind, fields = SCHEMAS[key]
+    for rec in records:
+        for v in rec.values():
+            if isinstance(v, str) and "\0" in v:
+                raise ValueError("NUL в строковом поле не поддерживается двоичным форматом")
+    parts = [MAGIC, _HEAD.pack(kind, len(records))]
+    for name, tag in fields:
+        parts.append(_pack(tag, [rec.get(name) for rec in records]))
+    return b"".join(parts)
+
+def loads(blob: bytes) -> dict[str, Any]:
+    if not blob.startswith(MAGIC):
+        raise ValueError("not a binary auth store")
+    kind, count = _HEAD.unpack_from(blob, len(MAGIC))
+    key, fields = _KINDS[kind]
+    pos = len(MAGIC) + _HEAD.size
+    columns = []
+    for _ in fields:
+        tag, size = _COL.unpack_from(blob, pos)
+        pos += _COL.size
+        columns.append(_unpack(tag, blob[pos:pos + size], count))
+        pos += size
+    names = [name for name, _ in fields]
+    records = [dict(zip(names, row)) for row in zip(*columns)]
+    if "fam" in names:
+        for rec in records:
+            if not rec["fam"]:
+                del rec["fam"]
+    return {key: records}
+
+def read(path: Path) -> dict[str, Any]:
+    return loads(path.read_bytes())
+
+def convert(src: Path, dst: Path) -> None:
+    """JSON <-> двоичный формат; направление определяется расширениями файлов."""
+    import storage
+    storage._atomic_write(dst, storage._read_db(src))
+
+def convert_dir(data_dir: Path, to: str) -> dict[str, dict[str, int]]:
+    """Переводит users/tokens каталога данных в формат `to` ("binary" или "json"); исходники не удаляются."""
+    import storage
+    src_ext, dst_ext = (".json", ".bin") if to == "binary" else (".bin", ".json")
+    report = {}
+    with storage.file_lock():
+        for name in ("users", "tokens"):
+            src, dst = data_dir / f"{name}{src_ext}", data_dir / f"{name}{dst_ext}"
+            if src.exists():
+                convert(src, dst)
+                report[name] = {"from_bytes": src.stat().st_size, "to_bytes": dst.stat().st_size}
+    return report
@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import metrics
+import storage
+
+JOURNAL_MAX_BYTES = int(os.getenv("TOKENS_JOURNAL_MAX_BYTES", str(1024 * 1024)))
+
+def _dumps(rec: dict[str, Any]) -> bytes:
+    return (json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+def _apply(tokens: dict[str, dict[str, Any]], groups: storage.TokenGroups, rec: dict[str, Any]) -> None:
+    if rec["op"] == "issue":
+        tokens[rec["token"]["jti"]] = rec["token"]
+        groups.add(rec["token"])
+    elif rec["op"] == "revoke" and rec["jti"] in tokens:
+        tokens[rec["jti"]]["revoked"] = True
+
+def _replay(tokens: dict[str, dict[str, Any]], groups: storage.TokenGroups, path: Path, offset: int = 0) -> int:
+    try:
+        with metrics.timer("storage.load"), open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # недописанная строка: дочитаем в следующий раз
+                _apply(tokens, groups, json.loads(line))
+                offset += len(line)
+    except FileNotFoundError:
+        pass
+    return offset
+
+def _drop_partial_tail(fd: int) -> None:
+    """Отрезает недописанную строку, оставшуюся после сбоя посреди дозаписи."""
+    size = pos = os.fstat(fd).st_size
+    cut = 0
+    while pos > 0:
+        start = max(0, pos - 4096)
+        i = os.pread(fd, pos - start, start).rfind(b"\n")
+        if i >= 0:
+            cut = start + i + 1
+            break
+        pos = start
+    if cut < size:
+        os.ftruncate(fd, cut)
+
+class JournalStorage(storage.JsonStorage):
+    """
+    Токены: снимок data/tokens.json плюс журнал событий issue/revoke (JSON lines).
+    Выпуск и отзыв — дозапись одной строки; при превышении TOKENS_JOURNAL_MAX_BYTES
+    журнал сворачивается в снимок в фоновом потоке. Пользователи — как в JsonStorage.
+    """
+
+    name = "journal"
+
+    def __init__(self, max_bytes: int = JOURNAL_MAX_BYTES) -> None:
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.journal_path = storage.DATA_DIR / "tokens.journal.jsonl"
+        self.compacting_path = storage.DATA_DIR / "tokens.journal.compacting.jsonl"
+        self._lock = threading.RLock()
+        self._compactor: threading.Thread | None = None
+        self._tokens: dict[str, dict[str, Any]] = {}
+        self._groups = storage.TokenGroups()
+        self._snapshot_stamp: list[int] | None = None
+        self._journal_ino: int | None = None
+        self._offset = 0
+
+    def _state(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            storage._ensure_files()
+            snap = storage._stamp(storage.TOKENS_PATH)
+            jst = storage._stamp(self.journal_path)
+            ino = jst[0] if jst else None
+            size = jst[2] if jst else 0
+            if snap != self._snapshot_stamp or ino != self._journal_ino or size < self._offset:
+                snapshot = storage._read_db(storage.TOKENS_PATH)
+                tokens = {t["jti"]: t for t in snapshot["tokens"]}
+                groups = storage.TokenGroups(snapshot["tokens"])
+                _replay(tokens, groups, self.compacting_path)
+                self._tokens, self._groups = tokens, groups
+                self._snapshot_stamp = snap
+                self._journal_ino = ino
+                self._offset = _replay(tokens, groups, self.journal_path)
+            elif size > self._offset:
+                self._offset = _replay(self._tokens, self._groups, self.journal_path, self._offset)
+            return self._tokens
+
+    def _append(self, recs: list[dict[str, Any]]) -> None:
+        with storage.file_lock(), self._lock:
+            with metrics.timer("storage.save"):
+                fd = os.open(self.journal_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    # под file_lock чужих дозаписей нет: хвост без \n — след сбоя, а не запись в процессе
+                    _drop_partial_tail(fd)
+                    os.write(fd, b"".join(_dumps(rec) for rec in recs))
+                    with metrics.timer("storage.fsync"):
+                        os.fsync(fd)
+                    size = os.fstat(fd).st_size
+                finally:
+                    os.close(fd)
+            self._state()
+            if size > self.max_bytes and not (self._compactor and self._compactor.is_alive()):
+                self._compactor = threading.Thread(target=self.compact, name="tokens-compactor")
+                self._compactor.start()
+
+    def compact(self) -> None:
+        """
+        Сворачивает журнал в снимок. Журнал сначала переименовывается, поэтому
+        после сбоя на любом шаге снимок + остатки журналов дают то же состояние.
+        """
+        with storage.file_lock():
+            if not self.compacting_path.exists():
+                if not self.journal_path.exists():
+                    return
+                os.replace(self.journal_path, self.compacting_path)
+            snapshot = storage._read_db(storage.TOKENS_PATH)
+            tokens = {t["jti"]: t for t in snapshot["tokens"]}
+            _replay(tokens, storage.TokenGroups(), self.compacting_path)
+            storage._atomic_write(storage.TOKENS_PATH, {"tokens": list(tokens.values())})
+            self.compacting_path.unlink(missing_ok=True)
+
+    def wait_compaction(self) -> None:
+        t = self._compactor
+        if t is not None:
+            t.join()
+
+    def generation(self) -> Any:
+        paths = (storage.TOKENS_PATH, self.compacting_path, self.journal_path)
+        return tuple(tuple(storage._stamp(p) or ()) for p in paths)
+
+    def load_tokens(self) -> dict[str, Any]:
+        with self._lock:
+            return {"tokens": [dict(t) for t in self._state().values()]}
+
+    def save_tokens(self, db: dict[str, Any]) -> None:
+        with storage.file_lock(), self._lock:
+            storage._atomic_write(storage.TOKENS_PATH, db)
+            self.compacting_path.unlink(missing_ok=True)
+            self.journal_path.unlink(missing_ok=True)
+
+    def get_token(self, jti: str) -> dict[str, Any] | None:
+        with self._lock:
+            t = self._state().get(jti)
+            return dict(t) if t else None
+
+    def get_tokens(self, jtis: list[str]) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            tokens = self._state()
+            return {jti: dict(tokens[jti]) for jti in jtis if jti in tokens}
+
+    def add_token(self, entry: dict[str, Any]) -> None:
+        self._append([{"op": "issue", "token": entry}])
+
+    def _is_active(self, jti: str) -> bool:
+        t = self._state().get(jti)
+        return t is not None and not t.get("revoked")
+
+    def revoke_token(self, jti: str) -> bool:
+        with storage.file_lock():
+            if not self._is_active(jti):
+                return False
+            self._append([{"op": "revoke", "jti": jti}])
+            return True
+
+    def rotate_token(self, jti: str, adds: list[dict[str, Any]]) -> bool:
+        with storage.file_lock():
+            if not self._is_active(jti):
+                return False
+            self.apply_tokens(adds, [jti])
+            return True
+
+    def apply_tokens(self, adds: list[dict[str, Any]], revokes: list[str]) -> None:
+        recs = [{"op": "issue", "token": t} for t in adds]
+        recs += [{"op": "revoke", "jti": jti} for jti in revokes]
+        self._append(recs)
+
+    def find_tokens(self, sub: str | None = None, fam: str | None = None) -> list[dict[str, Any]]:
+        with self._lock:
+            tokens = self._state()
+            return [dict(tokens[jti]) for jti in self._groups.select(sub, fam)]
+
+    def revoke_matching(self, sub: str | None = None, fam: str | None = None) -> int:
+        with storage.file_lock():
+            tokens = self._state()
+            jtis = [jti for jti in self._groups.select(sub, fam) if not tokens[jti].get("revoked")]
+            if jtis:
+                self._append([{"op": "revoke", "jti": jti} for jti in jtis])
+            return len(jtis)
+
+    def purge_expired(self, before: int) -> tuple[int, int]:
+        self.wait_compaction()
+        with storage.file_lock(), self._lock:
+            paths = (storage.TOKENS_PATH, self.compacting_path, self.journal_path)
+            size = sum(storage._file_size(p) for p in paths)
+            tokens = self._state()
+            keep = [t for t in tokens.values() if t["exp"] >= before]
+            removed = len(tokens) - len(keep)
+            if removed:
+                self.save_tokens({"tokens": keep})
+            return removed, size - sum(storage._file_size(p) for p in paths)
+
+    def clear(self) -> None:
+        self.wait_compaction()
+        with storage.file_lock(), self._lock:
+            super().clear()
+            self.compacting_path.unlink(missing_ok=True)
+            self.journal_path.unlink(missing_ok=True)
+            self._snapshot_stamp = None
@@ -0,0 +1,231 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+import metrics
+
+USER_FIELDS = ("username", "email", "password_hash", "failed_attempts", "locked_until")
+TOKEN_FIELDS = ("jti", "sub", "typ", "exp", "revoked", "fam")
+TOKEN_INSERT = "INSERT OR REPLACE INTO tokens (jti, sub, typ, exp, revoked, fam) VALUES (?, ?, ?, ?, ?, ?)"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    failed_attempts INTEGER NOT NULL DEFAULT 0,
+    locked_until REAL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    jti TEXT PRIMARY KEY,
+    sub TEXT NOT NULL,
+    typ TEXT NOT NULL,
+    exp INTEGER NOT NULL,
+    revoked INTEGER NOT NULL DEFAULT 0,
+    fam TEXT
+);
+CREATE INDEX IF NOT EXISTS users_email ON users(email);
+"""
+
+TOKEN_INDEXES = """
+CREATE INDEX IF NOT EXISTS tokens_sub ON tokens(sub);
+CREATE INDEX IF NOT EXISTS tokens_fam ON tokens(fam);
+"""
+
+def _token_row(entry: dict[str, Any]) -> tuple:
+    return (entry["jti"], entry["sub"], entry["typ"], entry["exp"], int(bool(entry.get("revoked"))), entry.get("fam"))
+
+def _token_record(row: sqlite3.Row) -> dict[str, Any]:
+    rec = dict(row)
+    rec["revoked"] = bool(rec["revoked"])
+    if rec.get("fam") is None:
+        rec.pop("fam", None)
+    return rec
+
+def _where(sub: str | None, fam: str | None) -> tuple[str, tuple]:
+    conds, params = [], []
+    if sub is not None:
+        conds.append("sub = ?")
+        params.append(sub)
+    if fam is not None:
+        conds.append("fam = ?")
+        params.append(fam)
+    return " AND ".join(conds) or "1", tuple(params)
+
+class SqliteStorage:
+    """Хранилище в SQLite (WAL): каждая запись пользователя или токена — одна строка."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+        self._writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            if "fam" not in {r["name"] for r in conn.execute("PRAGMA table_info(tokens)")}:
+                conn.execute("ALTER TABLE tokens ADD COLUMN fam TEXT")
+            conn.executescript(TOKEN_INDEXES)
+            self._conn = conn
+        return self._conn
+
+    def _write(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock, metrics.timer("storage.save"):
+            self._writes += 1
+            return self._db().execute(sql, params)
+
+    def _write_many(self, statements: list[tuple[str, list[tuple]]]) -> None:
+        with self._lock, metrics.timer("storage.save"):
+            conn = self._db()
+            self._writes += 1
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, rows in statements:
+                    conn.executemany(sql, rows)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _read(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        with self._lock, metrics.timer("storage.load"):
+            return self._db().execute(sql, params).fetchall()
+
+    def load_users(self) -> dict[str, Any]:
+        return {"users": [dict(r) for r in self._read("SELECT * FROM users ORDER BY rowid")]}
+
+    def save_users(self, db: dict[str, Any]) -> None:
+        rows = [tuple(rec.get(f) for f in USER_FIELDS) for rec in db["users"]]
+        self._write_many([
+            ("DELETE FROM users", [()]),
+            ("INSERT INTO users VALUES (?, ?, ?, ?, ?)", rows),
+        ])
+
+    def get_user(self, username: str) -> dict[str, Any] | None:
+        rows = self._read("SELECT * FROM users WHERE username = ?", (username,))
+        return dict(rows[0]) if rows else None
+
+    def get_user_by_email(self, email: str) -> dict[str, Any] | None:
+        rows = self._read("SELECT * FROM users WHERE email = ? ORDER BY rowid LIMIT 1", (email,))
+        return dict(rows[0]) if rows else None
+
+    def user_exists(self, username: str) -> bool:
+        return bool(self._read("SELECT 1 FROM users WHERE username = ?", (username,)))
+
+    def insert_user(self, rec: dict[str, Any]) -> bool:
+        cur = self._write("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?)", tuple(rec.get(f) for f in USER_FIELDS))
+        return cur.rowcount > 0
+
+    def upsert_user(self, rec: dict[str, Any]) -> None:
+        self._write(
+            "INSERT INTO users VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(username) DO UPDATE SET email = excluded.email, "
+            "password_hash = excluded.password_hash, failed_attempts = excluded.failed_attempts, "
+            "locked_until = excluded.locked_until",
+            tuple(rec.get(f) for f in USER_FIELDS),
+        )
+
+    def generation(self) -> Any:
+        # data_version меняется только от коммитов других соединений, свои считаем сами
+        with self._lock:
+            return self._read("PRAGMA data_version")[0][0], self._writes
+
+    def insert_users(self, recs: list[dict[str, Any]]) -> list[str]:
+        with self._lock, metrics.timer("storage.save"):
+            conn = self._db()
+            self._writes += 1
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                skipped = [
+                    rec["username"] for rec in recs
+                    if conn.execute("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?)",
+                                    tuple(rec.get(f) for f in USER_FIELDS)).rowcount == 0
+                ]
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return skipped
+
+    def load_tokens(self) -> dict[str, Any]:
+        return {"tokens": [_token_record(r) for r in self._read("SELECT * FROM tokens ORDER BY rowid")]}
+
+    def save_tokens(self, db: dict[str, Any]) -> None:
+        self._write_many([
+            ("DELETE FROM tokens", [()]),
+            (TOKEN_INSERT, [_token_row(t) for t in db["tokens"]]),
+        ])
+
+    def get_token(self, jti: str) -> dict[str, Any] | None:
+        rows = self._read("SELECT * FROM tokens WHERE jti = ?", (jti,))
+        return _token_record(rows[0]) if rows else None
+
+    def get_tokens(self, jtis: list[str]) -> dict[str, dict[str, Any]]:
+        found: dict[str, dict[str, Any]] = {}
+        for i in range(0, len(jtis), 500):
+            chunk = jtis[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for row in self._read(f"SELECT * FROM tokens WHERE jti IN ({marks})", tuple(chunk)):
+                found[row["jti"]] = _token_record(row)
+        return found
+
+    def add_token(self, entry: dict[str, Any]) -> None:
+        self._write(TOKEN_INSERT, _token_row(entry))
+
+    def apply_tokens(self, adds: list[dict[str, Any]], revokes: list[str]) -> None:
+        self._write_many([
+            (TOKEN_INSERT, [_token_row(t) for t in adds]),
+            ("UPDATE tokens SET revoked = 1 WHERE jti = ?", [(jti,) for jti in revokes]),
+        ])
+
+    def revoke_token(self, jti: str) -> bool:
+        return self._write("UPDATE tokens SET revoked = 1 WHERE jti = ? AND revoked = 0", (jti,)).rowcount > 0
+
+    def rotate_token(self, jti: str, adds: list[dict[str, Any]]) -> bool:
+        with self._lock, metrics.timer("storage.save"):
+            conn = self._db()
+            self._writes += 1
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                won = conn.execute("UPDATE tokens SET revoked = 1 WHERE jti = ? AND revoked = 0", (jti,)).rowcount > 0
+                if won:
+                    conn.executemany(TOKEN_INSERT, [_token_row(t) for t in adds])
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT" if won else "ROLLBACK")
+            return won
+
+    def find_tokens(self, sub: str | None = None, fam: str | None = None) -> list[dict[str, Any]]:
+        where, params = _where(sub, fam)
+        return [_token_record(r) for r in self._read(f"SELECT * FROM tokens WHERE {where} ORDER BY rowid", params)]
+
+    def revoke_matching(self, sub: str | None = None, fam: str | None = None) -> int:
+        where, params = _where(sub, fam)
+        return self._write(f"UPDATE tokens SET revoked = 1 WHERE {where} AND revoked = 0", params).rowcount
+
+    def purge_expired(self, before: int) -> tuple[int, int]:
+        with self._lock:
+            page_size = self._read("PRAGMA page_size")[0][0]
+            free_before = self._read("PRAGMA freelist_count")[0][0]
+            removed = self._write("DELETE FROM tokens WHERE exp < ?", (before,)).rowcount
+            free_after = self._read("PRAGMA freelist_count")[0][0]
+        return removed, (free_after - free_before) * page_size
+
+    def clear(self) -> None:
+        self._write_many([("DELETE FROM users", [()]), ("DELETE FROM tokens", [()])])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
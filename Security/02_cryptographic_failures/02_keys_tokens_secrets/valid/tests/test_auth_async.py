@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import auth_async
+import storage
+
+def test_concurrent_async_logins():
+    async def scenario():
+        names = [f"async{i}" for i in range(4)]
+        await asyncio.gather(*(auth_async.register_user(n, f"{n}@example.com", "Password123!") for n in names))
+        pairs = await asyncio.gather(*(auth_async.login(n, "Password123!") for n in names))
+
+        payloads = await asyncio.gather(*(auth_async.verify_access(a) for a, _ in pairs))
+        assert [p["sub"] for p in payloads] == names
+
+        access2, _ = await auth_async.refresh_pair(pairs[0][1])
+        assert (await auth_async.verify_access(access2))["sub"] == "async0"
+
+        try:
+            await auth_async.login("async1", "wrong")
+            assert False, "expected invalid credentials"
+        except ValueError as e:
+            assert "invalid credentials" in str(e)
+
+        try:
+            await auth_async.register_user("async2", "x@example.com", "Password123!")
+            assert False, "expected duplicate"
+        except ValueError as e:
+            assert "exists" in str(e)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        auth_async.shutdown()
+        storage.clear_data()
+
+def test_verify_access_runs_in_parallel(monkeypatch):
+    # с одним потоком ввода-вывода вторая проверка ждала бы первую и барьер не прошёл бы
+    barrier = threading.Barrier(2, timeout=5)
+
+    def verify(token):
+        barrier.wait()
+        return {"sub": token}
+
+    monkeypatch.setattr(auth_async.auth, "verify_access", verify)
+
+    async def scenario():
+        return await asyncio.gather(auth_async.verify_access("a"), auth_async.verify_access("b"))
+
+    try:
+        assert [p["sub"] for p in asyncio.run(scenario())] == ["a", "b"]
+    finally:
+        auth_async.shutdown()
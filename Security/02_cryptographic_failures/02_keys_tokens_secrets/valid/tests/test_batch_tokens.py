@@ -0,0 +1,41 @@
+import auth
+import storage
+import user
+
+def _count_token_writes(monkeypatch) -> list:
+    writes = []
+    orig = storage._atomic_write
+
+    def counting(path, data):
+        if path == storage.TOKENS_PATH:
+            writes.append(path)
+        orig(path, data)
+
+    monkeypatch.setattr(storage, "_atomic_write", counting)
+    return writes
+
+def test_login_and_refresh_write_tokens_once(monkeypatch):
+    user.register_user("nina", "nina@example.com", "Password123!")
+    writes = _count_token_writes(monkeypatch)
+
+    _, refresh = auth.login("nina", "Password123!")
+    assert len(writes) == 1
+
+    access2, _ = auth.refresh_pair(refresh)
+    assert len(writes) == 2
+    assert auth.introspect(refresh)["active"] is False
+    assert auth.verify_access(access2)["sub"] == "nina"
+
+    storage.clear_data()
+
+def test_issue_pairs_bulk_single_write(monkeypatch):
+    writes = _count_token_writes(monkeypatch)
+    subjects = [f"user{i}" for i in range(50)]
+
+    pairs = auth.issue_pairs(subjects)
+    assert len(writes) == 1
+    assert len(pairs) == 50
+    assert len(storage.load_tokens()["tokens"]) == 100
+    assert auth.verify_access(pairs[7][0])["sub"] == "user7"
+
+    storage.clear_data()
@@ -0,0 +1,15 @@
+import pytest
+from bench import stress_concurrency
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "journal"])
+def test_parallel_workers_lose_no_records(tmp_path, backend):
+    rep = stress_concurrency.run(workers=3, iterations=5, backend=backend, data_dir=str(tmp_path))
+    assert rep["lost"] == 0
+    assert rep["lost_revocations"] == 0
+    assert rep["stored"] == rep["expected"]
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "journal"])
+def test_parallel_refresh_of_one_token_redeems_once(tmp_path, backend):
+    rep = stress_concurrency.race(workers=3, backend=backend, data_dir=str(tmp_path))
+    assert rep["race_redeemed"] == 1
+    assert rep["race_active"] == 0
@@ -0,0 +1,89 @@
+import json
+import os
+import socket
+import stat
+import threading
+import pytest
+import auth
+import client
+import daemon
+import storage
+import user
+
+def test_client_talks_to_daemon(tmp_path):
+    addr = str(tmp_path / "auth.sock")
+    server = daemon.make_server(addr)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        code, out = client.request(["users", "add", "--username", "mark", "--email", "mark@example.com",
+                                    "--password", "Password123!"], addr)
+        assert (code, out) == (0, "OK\n")
+
+        code, out = client.request(["login", "--username", "mark", "--password", "Password123!"], addr)
+        assert code == 0
+        access = json.loads(out)["access_token"]
+
+        code, out = client.request(["me", "--access", access], addr)
+        assert code == 0 and json.loads(out)["sub"] == "mark"
+
+        code, out = client.request(["login", "--username", "mark", "--password", "wrong"], addr)
+        assert code == 1 and "invalid credentials" in out
+
+        code, _ = client.request(["serve"], addr)
+        assert code == 2
+        code, _ = client.request(["no-such-command"], addr)
+        assert code == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+        storage.clear_data()
+
+def test_tcp_daemon_requires_token_file(tmp_path):
+    token_file = tmp_path / "daemon.token"
+    server = daemon.make_server("tcp://127.0.0.1:0", str(token_file))
+    addr = "tcp://127.0.0.1:%d" % server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert stat.S_IMODE(os.stat(token_file).st_mode) == 0o600
+        code, out = client.request(["sessions", "revoke", "--user", "mark"], addr, str(token_file))
+        assert code == 0 and json.loads(out) == {"revoked": 0}
+
+        forged = tmp_path / "forged.token"
+        forged.write_text("guess", encoding="utf-8")
+        code, out = client.request(["sessions", "revoke", "--user", "mark"], addr, str(forged))
+        assert code == 2 and "токен демона" in out
+    finally:
+        server.shutdown()
+        server.server_close()
+        storage.clear_data()
+
+def test_tcp_daemon_listens_on_ipv6_loopback(tmp_path):
+    if not socket.has_ipv6:
+        pytest.skip("no IPv6")
+    try:
+        server = daemon.make_server("tcp://[::1]:0", str(tmp_path / "daemon.token"))
+    except OSError:
+        pytest.skip("::1 is not configured")
+    try:
+        assert server.address_family == socket.AF_INET6
+    finally:
+        server.server_close()
+
+def test_parallel_requests_keep_their_own_output():
+    user.register_user("pavel", "pavel@example.com", "Password123!")
+    tokens = [auth.login("pavel", "Password123!")[0] for _ in range(8)]
+    results = [None] * len(tokens)
+
+    def call(i):
+        results[i] = daemon.dispatch(["me", "--access", tokens[i]])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(tokens))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for token, (code, out) in zip(tokens, results):
+        assert code == 0
+        assert json.loads(out)["jti"] == auth.introspect(token)["jti"]
+
+    storage.clear_data()
@@ -0,0 +1,38 @@
+import time
+import auth
+import storage
+import user
+
+def _old(jti: str, age: int) -> dict:
+    return {"jti": jti, "sub": "kate", "typ": "access", "exp": int(time.time()) - age, "revoked": False}
+
+def test_gc_removes_tokens_expired_beyond_grace():
+    user.register_user("kate", "kate@example.com", "Password123!")
+    access, _ = auth.login("kate", "Password123!")
+    storage.add_token(_old("old-1", 7200))
+    storage.add_token(_old("old-2", 7200))
+    storage.add_token(_old("recent", 60))
+
+    res = auth.gc(grace_sec=3600)
+    assert res["removed"] == 2
+    assert res["bytes"] > 0
+
+    assert storage.get_token("old-1") is None
+    assert storage.get_token("recent") is not None
+    assert auth.introspect(access)["active"] is True
+    assert auth.gc(grace_sec=3600) == {"removed": 0, "bytes": 0}
+
+    storage.clear_data()
+
+def test_auto_gc_runs_on_login(monkeypatch):
+    monkeypatch.setattr(auth, "GC_AUTO_INTERVAL_SEC", 60)
+    storage.GC_STAMP_PATH.unlink(missing_ok=True)
+    user.register_user("leo", "leo@example.com", "Password123!")
+    storage.add_token(_old("stale", 10 * 86400))
+
+    auth.login("leo", "Password123!")
+    assert storage.get_token("stale") is None
+    assert storage.GC_STAMP_PATH.exists()
+
+    storage.GC_STAMP_PATH.unlink()
+    storage.clear_data()
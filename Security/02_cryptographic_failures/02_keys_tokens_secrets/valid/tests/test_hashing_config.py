@@ -0,0 +1,33 @@
+import calibrate
+import cli
+import user
+
+def test_hash_context_is_shared_and_configurable(monkeypatch):
+    monkeypatch.setattr(user, "_ctx", None)
+    monkeypatch.setattr(user, "BCRYPT_ROUNDS", 5)
+    ctx = user.hash_context()
+    assert user.hash_context() is ctx
+
+    ph = user.hash_password("Password123!")
+    assert ph.startswith("$2b$05$")
+    u = user.User(username="h", email="h@example.com", password_hash=ph)
+    assert user.verify_password(u, "Password123!")
+    assert not user.verify_password(u, "wrong")
+
+def test_calibrate_bcrypt_picks_rounds_within_target():
+    res = calibrate.calibrate_bcrypt(target_ms=10_000, rounds=range(4, 7), repeat=1)
+    assert res["params"] == {"BCRYPT_ROUNDS": 6}
+    assert res["within_target"] is True
+    assert res["logins_per_sec_per_core"] > 0
+
+    # цель недостижима: минимальный cost помечен как не уложившийся
+    res = calibrate.calibrate_bcrypt(target_ms=0.0001, rounds=range(4, 7), repeat=1)
+    assert res["params"] == {"BCRYPT_ROUNDS": 4}
+    assert res["within_target"] is False
+
+def test_calibrate_cli_fails_when_target_unreachable(monkeypatch, capsys):
+    monkeypatch.setattr(calibrate, "calibrate_bcrypt",
+                        lambda target_ms: calibrate._report({"BCRYPT_ROUNDS": 10}, 50.0, within_target=False))
+    args = cli.build().parse_args(["calibrate", "--scheme", "bcrypt", "--target-ms", "1"])
+    assert args.func(args) == 1
+    assert "bcrypt" in capsys.readouterr().err
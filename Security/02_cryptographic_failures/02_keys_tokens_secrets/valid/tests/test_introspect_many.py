@@ -0,0 +1,52 @@
+import io
+import json
+import sys
+import auth
+import cli
+import storage
+import user
+
+def test_batch_introspection_and_verification_keep_order():
+    user.register_user("fedor", "fedor@example.com", "Password123!")
+    a1, r1 = auth.login("fedor", "Password123!")
+    a2, _ = auth.login("fedor", "Password123!")
+    auth.revoke(a2)
+
+    res = auth.introspect_many([a1, "garbage", a2, r1])
+    assert [r["active"] for r in res] == [True, False, False, True]
+    assert res[1]["error"] == "invalid_token"
+    assert res[3]["typ"] == "refresh"
+    assert res == [auth.introspect(t) for t in [a1, "garbage", a2, r1]]
+
+    res = auth.verify_access_many([a1, a2, r1, "garbage"])
+    assert res[0]["valid"] is True and res[0]["payload"]["sub"] == "fedor"
+    assert res[1] == {"valid": False, "error": "token revoked"}
+    assert res[2] == {"valid": False, "error": "wrong token type"}
+    assert res[3]["valid"] is False
+
+    storage.clear_data()
+
+def test_introspect_stdin_streams_ndjson(monkeypatch, capsys):
+    user.register_user("galya", "galya@example.com", "Password123!")
+    access, _ = auth.login("galya", "Password123!")
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO(f'"{access}"\n\n{{"token": "bad"}}\n{access}\n'))
+    assert cli.cmd_introspect(cli.build().parse_args(["introspect", "--stdin"])) == 0
+    out = [json.loads(x) for x in capsys.readouterr().out.splitlines()]
+    assert [r["active"] for r in out] == [True, False, True]
+
+    storage.clear_data()
+
+def test_verify_access_many_checks_generation_once(monkeypatch):
+    user.register_user("gleb", "gleb@example.com", "Password123!")
+    tokens = [auth.login("gleb", "Password123!")[0] for _ in range(5)]
+    auth.verify_access_many(tokens)  # заполняет кэш
+
+    calls = []
+    generation = storage.generation
+    monkeypatch.setattr(storage, "generation", lambda: calls.append(1) or generation())
+    res = auth.verify_access_many(tokens)
+    assert all(r["valid"] for r in res)
+    assert len(calls) == 1
+
+    storage.clear_data()
@@ -0,0 +1,44 @@
+import argparse
+import json
+import auth
+import cli
+import metrics
+import storage
+import user
+
+def test_phases_recorded_and_flushed(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "metrics_path", lambda: tmp_path / "metrics.json")
+    metrics.reset()
+
+    user.register_user("sofia", "sofia@example.com", "Password123!")
+    access, refresh = auth.login("sofia", "Password123!")
+    auth.verify_access(access)
+    auth.refresh_pair(refresh)
+
+    stats = metrics.summary(metrics.snapshot())
+    for phase in ("hash", "hash.verify", "jwt.encode", "jwt.decode", "storage.load",
+                  "storage.save", "storage.fsync", "auth.login", "auth.refresh", "auth.verify_access"):
+        assert stats[phase]["count"] >= 1, phase
+    assert stats["auth.login"]["count"] == 1
+    s = stats["auth.login"]
+    assert s["min_ms"] <= s["p50_ms"] <= s["p99_ms"] <= s["max_ms"]
+
+    metrics.flush()
+    assert metrics._hist == {}
+    auth.login("sofia", "Password123!")
+    assert metrics.summary(metrics.snapshot())["auth.login"]["count"] == 2
+
+    cli.cmd_stats(argparse.Namespace(json=True, reset=False))
+    assert json.loads(capsys.readouterr().out)["auth.login"]["count"] == 2
+
+    metrics.reset()
+    assert metrics.summary(metrics.snapshot()) == {}
+    storage.clear_data()
+
+def test_disabled_timer_records_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    metrics._hist.clear()
+    with metrics.timer("x"):
+        pass
+    assert metrics._hist == {}
@@ -0,0 +1,115 @@
+import sqlite3
+import threading
+import pytest
+import auth
+import cli
+import storage
+import user
+from storage_journal import JournalStorage
+from storage_sqlite import SqliteStorage
+
+def _open(name, tmp_path):
+    if name == "sqlite":
+        return SqliteStorage(tmp_path / "auth.db")
+    if name == "journal":
+        return JournalStorage()
+    return storage.JsonStorage()
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "journal"])
+def test_revoke_all_sessions_of_user(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(storage, "_backend", _open(backend, tmp_path))
+    user.register_user("oleg", "oleg@example.com", "Password123!")
+    user.register_user("vera", "vera@example.com", "Password123!")
+    a1, r1 = auth.login("oleg", "Password123!")
+    a2, _ = auth.login("oleg", "Password123!")
+    a3, r3 = auth.login("vera", "Password123!")
+    auth.refresh_pair(r1)
+
+    listed = auth.sessions("oleg")
+    assert len(listed) == 2
+    assert sorted(len(s["tokens"]) for s in listed) == [2, 4]
+    assert all(s["active"] for s in listed)
+    assert all(t["sub"] == "oleg" for s in listed for t in s["tokens"])
+
+    assert auth.verify_access(a2)["sub"] == "oleg"
+    assert auth.revoke_all("oleg") == 5
+    assert auth.revoke_all("oleg") == 0
+    assert not any(s["active"] for s in auth.sessions("oleg"))
+    with pytest.raises(ValueError, match="revoked"):
+        auth.verify_access(a2)
+    assert auth.verify_access(a3)["sub"] == "vera"
+    assert auth.introspect(r3)["active"] is True
+
+    storage.clear_data()
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "journal"])
+def test_refresh_reuse_revokes_family(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(storage, "_backend", _open(backend, tmp_path))
+    user.register_user("ivan", "ivan@example.com", "Password123!")
+    _, r1 = auth.login("ivan", "Password123!")
+    _, other = auth.login("ivan", "Password123!")
+    _, r2 = auth.refresh_pair(r1)
+    a3, r3 = auth.refresh_pair(r2)
+
+    with pytest.raises(ValueError, match="revoked"):
+        auth.refresh_pair(r1)
+    assert auth.introspect(a3)["active"] is False
+    assert auth.introspect(r3)["active"] is False
+    # другая сессия того же пользователя не затронута
+    assert auth.introspect(other)["active"] is True
+
+    storage.clear_data()
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "journal"])
+def test_concurrent_refresh_redeems_once(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(storage, "_backend", _open(backend, tmp_path))
+    user.register_user("nina", "nina@example.com", "Password123!")
+    _, r1 = auth.login("nina", "Password123!")
+    start = threading.Barrier(4)
+    issued, errors = [], []
+
+    def redeem():
+        start.wait()
+        try:
+            issued.append(auth.refresh_pair(r1)[1])
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=redeem) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(issued) == 1 and len(errors) == 3
+    assert all("revoked" in e for e in errors)
+    # повтор обнаружен — пара победителя тоже отозвана
+    assert auth.introspect(issued[0])["active"] is False
+
+    storage.clear_data()
+
+def test_sqlite_migrates_tokens_without_family(tmp_path, monkeypatch):
+    path = tmp_path / "auth.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tokens (jti TEXT PRIMARY KEY, sub TEXT NOT NULL, typ TEXT NOT NULL,"
+                 " exp INTEGER NOT NULL, revoked INTEGER NOT NULL DEFAULT 0)")
+    conn.execute("INSERT INTO tokens VALUES ('old', 'oleg', 'refresh', 1, 0)")
+    conn.commit()
+    conn.close()
+
+    db = SqliteStorage(path)
+    monkeypatch.setattr(storage, "_backend", db)
+    assert storage.find_tokens(sub="oleg") == [{"jti": "old", "sub": "oleg", "typ": "refresh", "exp": 1, "revoked": False}]
+    assert storage.revoke_matching(sub="oleg") == 1
+    db.close()
+
+def test_sessions_commands_report_storage_errors(monkeypatch, capsys):
+    def broken(*args, **kwargs):
+        raise sqlite3.DatabaseError("database disk image is malformed")
+
+    monkeypatch.setattr(storage, "find_tokens", broken)
+    monkeypatch.setattr(storage, "revoke_matching", broken)
+    for argv in (["sessions", "list", "--user", "oleg"], ["sessions", "revoke", "--user", "oleg"]):
+        args = cli.build().parse_args(argv)
+        assert args.func(args) == 1
+        assert capsys.readouterr().out == "Ошибка: database disk image is malformed\n"
@@ -0,0 +1,46 @@
+import auth
+import storage
+import user
+from storage_sqlite import SqliteStorage
+
+def test_sqlite_backend_full_flow(tmp_path, monkeypatch):
+    db = SqliteStorage(tmp_path / "auth.db")
+    monkeypatch.setattr(storage, "_backend", db)
+
+    user.register_user("petr", "petr@example.com", "Password123!")
+    access, refresh = auth.login("petr", "Password123!")
+    assert auth.verify_access(access)["sub"] == "petr"
+
+    _, refresh2 = auth.refresh_pair(refresh)
+    try:
+        auth.refresh_pair(refresh)
+        assert False, "expected old refresh to be revoked"
+    except Exception as e:
+        assert "revoked" in str(e).lower()
+
+    auth.revoke(access)
+    assert auth.introspect(access)["active"] is False
+    # повторный refresh отозвал всю цепочку сессии
+    assert auth.introspect(refresh2)["active"] is False
+
+    assert db._read("PRAGMA journal_mode")[0][0] == "wal"
+    assert len(storage.load_tokens()["tokens"]) == 4
+    db.close()
+
+def test_sqlite_load_save_compat(tmp_path, monkeypatch):
+    db = SqliteStorage(tmp_path / "auth.db")
+    monkeypatch.setattr(storage, "_backend", db)
+
+    storage.save_users({"users": [{"username": "a", "email": "a@example.com", "password_hash": "h",
+                                   "failed_attempts": 0, "locked_until": None}]})
+    storage.save_tokens({"tokens": [{"jti": "j1", "sub": "a", "typ": "access", "exp": 1, "revoked": True}]})
+
+    assert storage.load_users()["users"][0]["email"] == "a@example.com"
+    assert storage.load_tokens() == {"tokens": [{"jti": "j1", "sub": "a", "typ": "access", "exp": 1, "revoked": True}]}
+    assert user.get_user("a").password_hash == "h"
+    assert user.get_user_by_email("a@example.com").username == "a"
+    assert user.user_exists("b") is False
+
+    storage.clear_data()
+    assert storage.load_users() == {"users": []}
+    db.close()
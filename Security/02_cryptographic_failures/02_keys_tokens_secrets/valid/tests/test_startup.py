@@ -0,0 +1,12 @@
+from bench import startup
+
+def test_light_commands_skip_heavy_imports():
+    report = startup.run(["help", "introspect-malformed", "stats"], repeat=1, scale=10)
+    for row in report:
+        assert row["forbidden_loaded"] == [], row
+        assert row["ok"], row
+
+def test_malformed_token_rejected_without_auth(capsys):
+    import cli
+    assert cli.cmd_introspect(cli.build().parse_args(["introspect", "--token", "not-a-jwt"])) == 1
+    assert '"invalid_token"' in capsys.readouterr().out
@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import pytest
+import auth
+import storage
+import storage_binary
+import user
+
+@pytest.fixture
+def binary_store(tmp_path):
+    old_dir, old_format = storage.DATA_DIR, storage.STORE_FORMAT
+    storage.set_data_dir(tmp_path, "binary")
+    yield tmp_path
+    storage.set_data_dir(old_dir, old_format)
+
+def test_binary_roundtrip():
+    tokens = {"tokens": [
+        {"jti": "j1", "sub": "юля", "typ": "refresh", "exp": 2 ** 40, "revoked": True, "fam": "j1"},
+        {"jti": "j2", "sub": "", "typ": "access", "exp": -1, "revoked": False},
+    ]}
+    users = {"users": [{"username": "a", "email": "a@example.com", "password_hash": "$2b$x",
+                        "failed_attempts": 3, "locked_until": 1.5},
+                       {"username": "b", "email": "b@example.com", "password_hash": "h",
+                        "failed_attempts": 0, "locked_until": None}]}
+    for db in (tokens, users, {"tokens": []}):
+        assert storage_binary.loads(storage_binary.dumps(db)) == db
+    with pytest.raises(ValueError):
+        storage_binary.loads(b"{}")
+
+def test_auth_flow_on_binary_store(binary_store):
+    user.register_user("rita", "rita@example.com", "Password123!")
+    access, refresh = auth.login("rita", "Password123!")
+    auth.refresh_pair(refresh)
+    assert auth.introspect(refresh)["active"] is False
+    assert auth.verify_access(access)["sub"] == "rita"
+
+    assert storage.TOKENS_PATH.name == "tokens.bin"
+    assert storage.TOKENS_PATH.read_bytes().startswith(storage_binary.MAGIC)
+
+    report = storage_binary.convert_dir(binary_store, "json")
+    assert report["tokens"]["to_bytes"] > report["tokens"]["from_bytes"]
+    storage.set_data_dir(binary_store, "json")
+    assert auth.introspect(refresh)["active"] is False
+    assert user.get_user("rita").email == "rita@example.com"
+
+def test_store_settings_come_from_dotenv(tmp_path, monkeypatch):
+    (tmp_path / ".env").write_text(
+        f"# storage\nJWT_SECRET=from-dotenv\nexport AUTH_STORE_FORMAT='binary'\nAUTH_DATA_DIR=\"{tmp_path}\"\n",
+        encoding="utf-8")
+    for key in (*storage.ENV_KEYS, "JWT_SECRET"):
+        monkeypatch.setenv(key, "")
+        monkeypatch.delenv(key)
+    monkeypatch.setattr(storage, "BASE_DIR", tmp_path)
+    monkeypatch.setitem(sys.modules, "dotenv", None)  # импорт python-dotenv упал бы
+    storage._load_env()
+    assert os.environ["AUTH_STORE_FORMAT"] == "binary"
+    assert os.environ["AUTH_DATA_DIR"] == str(tmp_path)
+    assert "JWT_SECRET" not in os.environ  # остальное из .env — забота crypto
+
+def test_unknown_store_format_fails_at_import():
+    env = dict(os.environ, AUTH_STORE_FORMAT="yaml", AUTH_DATA_DIR="unused")
+    proc = subprocess.run([sys.executable, "-c", "import storage"], cwd=storage.BASE_DIR,
+                          env=env, capture_output=True, text=True)
+    assert proc.returncode != 0
+    assert "unknown AUTH_STORE_FORMAT: yaml" in proc.stderr
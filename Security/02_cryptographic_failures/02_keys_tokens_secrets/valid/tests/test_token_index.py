@@ -0,0 +1,37 @@
+import auth
+import storage
+import user
+
+def test_revocation_uses_in_memory_jti_index():
+    user.register_user("ivan", "ivan@example.com", "Password123!")
+    access, refresh = auth.login("ivan", "Password123!")
+    a = auth.introspect(access)
+    r = auth.introspect(refresh)
+
+    assert set(storage.backend()._tokens_cache["index"]) == {a["jti"], r["jti"]}
+    # индекс не пишется на диск: каждая запись токенов — один файл
+    assert sorted(p.name for p in storage.DATA_DIR.glob("tokens*")) == ["tokens.json"]
+
+    auth.revoke(access)
+    assert auth.is_revoked(a["jti"]) is True
+    assert auth.is_revoked(r["jti"]) is False
+    assert auth.is_revoked("unknown-jti") is False
+
+    storage.clear_data()
+
+def test_index_rebuilt_after_external_write():
+    user.register_user("olga", "olga@example.com", "Password123!")
+    access, _ = auth.login("olga", "Password123!")
+    jti = auth.introspect(access)["jti"]
+
+    db = storage.load_tokens()
+    for t in db["tokens"]:
+        if t["jti"] == jti:
+            t["revoked"] = True
+    db["tokens"].insert(0, {"jti": "x", "sub": "olga", "typ": "access", "exp": 0, "revoked": False})
+    storage.save_tokens(db)
+
+    assert auth.is_revoked(jti) is True
+    assert storage.get_token("x")["sub"] == "olga"
+
+    storage.clear_data()
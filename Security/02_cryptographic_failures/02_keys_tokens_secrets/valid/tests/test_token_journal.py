@@ -0,0 +1,59 @@
+import json
+import auth
+import storage
+import user
+from storage_journal import JournalStorage
+
+def test_journal_appends_and_rebuilds_state(monkeypatch):
+    monkeypatch.setattr(storage, "_backend", JournalStorage())
+    user.register_user("lena", "lena@example.com", "Password123!")
+    access, refresh = auth.login("lena", "Password123!")
+    auth.revoke(access)
+
+    lines = storage.backend().journal_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(x)["op"] for x in lines] == ["issue", "issue", "revoke"]
+    assert json.loads(storage.TOKENS_PATH.read_text(encoding="utf-8")) == {"tokens": []}
+
+    # новый процесс: снимок + хвост журнала
+    monkeypatch.setattr(storage, "_backend", JournalStorage())
+    assert auth.introspect(access)["active"] is False
+    assert auth.introspect(refresh)["active"] is True
+
+    storage.clear_data()
+
+def test_journal_compacts_into_snapshot(monkeypatch):
+    db = JournalStorage(max_bytes=200)
+    monkeypatch.setattr(storage, "_backend", db)
+    user.register_user("gleb", "gleb@example.com", "Password123!")
+    access, refresh = auth.login("gleb", "Password123!")
+    _, refresh2 = auth.refresh_pair(refresh)
+    db.wait_compaction()
+
+    snapshot = json.loads(storage.TOKENS_PATH.read_text(encoding="utf-8"))
+    assert len(snapshot["tokens"]) >= 2
+    assert not db.compacting_path.exists()
+
+    monkeypatch.setattr(storage, "_backend", JournalStorage())
+    assert len(storage.load_tokens()["tokens"]) == 4
+    assert auth.introspect(refresh)["active"] is False
+    assert auth.introspect(refresh2)["active"] is True
+    assert auth.introspect(access)["active"] is True
+
+    storage.clear_data()
+
+def test_journal_drops_partial_line_left_by_crash(monkeypatch):
+    db = JournalStorage()
+    monkeypatch.setattr(storage, "_backend", db)
+    user.register_user("oleg", "oleg@example.com", "Password123!")
+    access, _ = auth.login("oleg", "Password123!")
+    with open(db.journal_path, "ab") as f:
+        f.write(b'{"op":"revoke","jt')  # процесс упал посреди записи
+
+    access2, refresh2 = auth.login("oleg", "Password123!")
+    monkeypatch.setattr(storage, "_backend", JournalStorage())
+    assert auth.introspect(access)["active"] is True
+    assert auth.introspect(access2)["active"] is True
+    assert auth.introspect(refresh2)["active"] is True
+    assert all(line.endswith("}") for line in db.journal_path.read_text(encoding="utf-8").splitlines())
+
+    storage.clear_data()
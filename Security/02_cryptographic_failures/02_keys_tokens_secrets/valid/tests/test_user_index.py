@@ -0,0 +1,34 @@
+import storage
+import user
+
+def test_lookup_by_username_and_email():
+    user.register_user("anna", "anna@example.com", "Password123!")
+    user.register_user("boris", "boris@example.com", "Password123!")
+
+    assert user.user_exists("anna") is True
+    assert user.user_exists("nobody") is False
+    assert user.get_user_by_email("boris@example.com").username == "boris"
+    assert user.get_user_by_email("nobody@example.com") is None
+
+    u = user.get_user("anna")
+    u.email = "anna@new.example.com"
+    u.failed_attempts = 2
+    user.save_user(u)
+    assert user.get_user_by_email("anna@example.com") is None
+    assert user.get_user_by_email("anna@new.example.com").failed_attempts == 2
+    assert len(storage.load_users()["users"]) == 2
+
+    storage.clear_data()
+
+def test_indexes_follow_external_writes():
+    user.register_user("dima", "dima@example.com", "Password123!")
+    assert user.user_exists("dima")
+
+    db = storage.load_users()
+    db["users"][0]["username"] = "dmitry"
+    storage.save_users(db)
+
+    assert user.user_exists("dima") is False
+    assert user.get_user_by_email("dima@example.com").username == "dmitry"
+
+    storage.clear_data()
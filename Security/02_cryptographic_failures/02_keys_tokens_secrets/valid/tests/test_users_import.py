@@ -0,0 +1,62 @@
+import pytest
+import auth
+import cli
+import storage
+import user
+from storage_sqlite import SqliteStorage
+
+def test_bulk_import_from_csv(tmp_path):
+    user.register_user("old", "old@example.com", "Password123!")
+    path = tmp_path / "users.csv"
+    path.write_text(
+        "username,email,password\n"
+        "imp1,imp1@example.com,Password123!\n"
+        "imp2,imp2@example.com,Password456!\n"
+        "imp1,dup@example.com,Password789!\n"
+        "old,old2@example.com,Password123!\n"
+        "imp3,,Password123!\n",
+        encoding="utf-8",
+    )
+
+    res = user.import_users(cli._read_users_file(str(path)), workers=2)
+    assert res["imported"] == 2
+    assert [e["line"] for e in res["errors"]] == [3, 4, 5]
+    assert res["users_per_sec"] > 0
+
+    assert len(storage.load_users()["users"]) == 3
+    access, _ = auth.login("imp2", "Password456!")
+    assert auth.verify_access(access)["sub"] == "imp2"
+
+    storage.clear_data()
+
+def test_bulk_import_from_jsonl(tmp_path):
+    path = tmp_path / "users.jsonl"
+    path.write_text('{"username": "j1", "email": "j1@example.com", "password": "Password123!"}\n\n',
+                    encoding="utf-8")
+    res = user.import_users(cli._read_users_file(str(path)), workers=1)
+    assert res["imported"] == 1
+    assert user.user_exists("j1")
+
+    storage.clear_data()
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_import_skips_names_taken_while_hashing(tmp_path, monkeypatch, backend):
+    if backend == "sqlite":
+        monkeypatch.setattr(storage, "_backend", SqliteStorage(tmp_path / "auth.db"))
+    hash_password = user.hash_password
+
+    def racing_hash(password):
+        # параллельный register успевает занять имя, пока идёт хэширование импорта
+        if not user.user_exists("race"):
+            user.create_user(user.User("race", "first@example.com", hash_password("Password123!")))
+        return hash_password(password)
+
+    monkeypatch.setattr(user, "hash_password", racing_hash)
+    rows = [{"username": n, "email": f"{n}@example.com", "password": "Password123!"} for n in ("a1", "race", "a2")]
+    res = user.import_users(rows, workers=1)
+    assert res["imported"] == 2
+    assert res["errors"] == [{"line": 2, "username": "race", "error": "user exists"}]
+    assert [u["username"] for u in storage.load_users()["users"]] == ["race", "a1", "a2"]
+    assert user.get_user("race").email == "first@example.com"
+
+    storage.clear_data()
@@ -0,0 +1,53 @@
+import auth
+import crypto
+import storage
+import user
+
+def _count_decodes(monkeypatch) -> list:
+    calls = []
+    orig = crypto.decode
+
+    def counting(token):
+        calls.append(token)
+        return orig(token)
+
+    monkeypatch.setattr(crypto, "decode", counting)
+    return calls
+
+def test_repeat_verify_is_cache_hit(monkeypatch):
+    user.register_user("vera", "vera@example.com", "Password123!")
+    access, _ = auth.login("vera", "Password123!")
+    calls = _count_decodes(monkeypatch)
+
+    for _ in range(5):
+        assert auth.verify_access(access)["sub"] == "vera"
+    assert len(calls) == 1
+
+    auth.revoke(access)
+    try:
+        auth.verify_access(access)
+        assert False, "revoked token must not be served from cache"
+    except ValueError as e:
+        assert "revoked" in str(e)
+
+    storage.clear_data()
+
+def test_cache_dropped_when_store_changes_on_disk():
+    user.register_user("yan", "yan@example.com", "Password123!")
+    access, _ = auth.login("yan", "Password123!")
+    jti = auth.verify_access(access)["jti"]
+
+    # отзыв "другим процессом" — прямая правка файла
+    db = storage.load_tokens()
+    for t in db["tokens"]:
+        if t["jti"] == jti:
+            t["revoked"] = True
+    storage.save_tokens(db)
+
+    try:
+        auth.verify_access(access)
+        assert False, "expected revoked"
+    except ValueError as e:
+        assert "revoked" in str(e)
+
+    storage.clear_data()
@@ -1,8 +1,35 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, asdict
-from typing import Optional, Any
+from typing import Optional, Any, Iterable
 from passlib.context import CryptContext
+import metrics
 import storage
 
+PASSWORD_SCHEME = os.getenv("PASSWORD_SCHEME", "bcrypt")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_KIB = int(os.getenv("ARGON2_MEMORY_KIB", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+
+_ctx: CryptContext | None = None
+
+def hash_context() -> CryptContext:
+    """Общий CryptContext процесса; параметры подбираются командой `cli.py calibrate`."""
+    global _ctx
+    if _ctx is None:
+        schemes = [PASSWORD_SCHEME] + [s for s in ("bcrypt", "argon2") if s != PASSWORD_SCHEME]
+        _ctx = CryptContext(
+            schemes=schemes,
+            deprecated="auto",
+            bcrypt__rounds=BCRYPT_ROUNDS,
+            argon2__rounds=ARGON2_TIME_COST,
+            argon2__memory_cost=ARGON2_MEMORY_KIB,
+            argon2__parallelism=ARGON2_PARALLELISM,
+        )
+    return _ctx
+
 @dataclass
 class User:
     username: str
@@ -19,34 +46,74 @@ class User:
         return cls(**rec)
 
 def get_user(username: str) -> Optional[User]:
-    db = storage.load_users()
-    for rec in db["users"]:
-        if rec["username"] == username:
-            return User.from_record(rec)
-    return None
+    rec = storage.get_user(username)
+    if rec is None:
+        return None
+    return User.from_record(rec)
 
 def save_user(u: User) -> None:
-    db = storage.load_users()
-    for i, rec in enumerate(db["users"]):
-        if rec["username"] == u.username:
-            db["users"][i] = u.to_record()
-            storage.save_users(db)
-            return
-    db["users"].append(u.to_record())
-    storage.save_users(db)
+    storage.upsert_user(u.to_record())
+
+def get_user_by_email(email: str) -> Optional[User]:
+    rec = storage.get_user_by_email(email)
+    if rec is None:
+        return None
+    return User.from_record(rec)
 
 def user_exists(username: str) -> bool:
-    return get_user(username) is not None
+    return storage.user_exists(username)
+
+def hash_password(password: str) -> str:
+    with metrics.timer("hash"):
+        return hash_context().hash(password)
+
+def create_user(u: User) -> User:
+    if not storage.insert_user(u.to_record()):
+        raise ValueError("user exists")
+    return u
 
 def register_user(username: str, email: str, password: str) -> User:
     if user_exists(username):
         raise ValueError("user exists")
-    ctx = CryptContext(schemes=["bcrypt"])
-    ph = ctx.hash(password)
-    u = User(username=username, email=email, password_hash=ph)
-    save_user(u)
-    return u
+    ph = hash_password(password)
+    return create_user(User(username=username, email=email, password_hash=ph))
 
 def verify_password(u: User, password: str) -> bool:
-    ctx = CryptContext(schemes=["bcrypt"])
-    return ctx.verify(password, u.password_hash)
+    with metrics.timer("hash.verify"):
+        return hash_context().verify(password, u.password_hash)
+
+def import_users(rows: Iterable[dict[str, Any]], workers: int | None = None) -> dict[str, Any]:
+    started = time.perf_counter()
+    lines: dict[str, int] = {}
+    accepted, errors = [], []
+    for line, row in enumerate(rows, 1):
+        username, email, password = row.get("username"), row.get("email"), row.get("password")
+        if not username or not email or not password:
+            errors.append({"line": line, "username": username, "error": "missing field"})
+        elif username in lines or storage.user_exists(username):
+            errors.append({"line": line, "username": username, "error": "user exists"})
+        else:
+            lines[username] = line
+            accepted.append((username, email, password))
+
+    passwords = [p for _, _, p in accepted]
+    if workers == 1 or len(passwords) < 2:
+        hashes = [hash_password(p) for p in passwords]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hashes = list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // 64)))
+
+    recs = [User(username=u, email=e, password_hash=h).to_record() for (u, e, _), h in zip(accepted, hashes)]
+    # пока шло хэширование, имя могли занять: хранилище проверяет ещё раз под блокировкой
+    taken = set(storage.insert_users(recs)) if recs else set()
+    if taken:
+        errors += [{"line": lines[u], "username": u, "error": "user exists"} for u in taken]
+        errors.sort(key=lambda e: e["line"])
+    elapsed = time.perf_counter() - started
+    return {
+        "imported": len(recs) - len(taken),
+        "skipped": len(errors),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "users_per_sec": round((len(recs) - len(taken)) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
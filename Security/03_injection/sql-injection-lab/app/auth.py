@@ -1,5 +1,146 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+import asyncpg
 from fastapi import HTTPException, Header
-from .db import get_pool
+from .db import DATABASE_URL, get_pool
+
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "30"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# канал, в который триггер из sql/init.sql шлёт значение отозванного токена
+TOKEN_CHANNEL = "token_invalidated"
+# пауза между попытками переподключить LISTEN растёт вдвое до этого предела
+LISTEN_RETRY_MAX = float(os.getenv("TOKEN_LISTEN_RETRY_MAX", "30"))
+
+
+class TokenCache:
+    """
+    Ограниченный кэш token -> user: запись живёт ttl секунд, при переполнении
+    вытесняется давно не использованная. Кэшируются только найденные токены,
+    поэтому перебор чужих токенов не вытесняет горячие записи.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._items: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        # растёт при каждой инвалидации: ответ запроса, начатого раньше, не кладётся в кэш
+        self.version = 0
+
+    def get(self, token: str) -> dict | None:
+        item = self._items.get(token)
+        if item is None:
+            return None
+        expires, user = item
+        if expires <= self._clock():
+            del self._items[token]
+            return None
+        self._items.move_to_end(token)
+        return user
+
+    def put(self, token: str, user: dict, version: int | None = None) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0 or (version is not None and version != self.version):
+            return
+        self._items[token] = (self._clock() + self.ttl, user)
+        self._items.move_to_end(token)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def invalidate(self, token: str) -> None:
+        self.version += 1
+        self._items.pop(token, None)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.version += 1
+        for token in [t for t, (_, u) in self._items.items() if u["id"] == user_id]:
+            del self._items[token]
+
+    def clear(self) -> None:
+        self.version += 1
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+token_cache = TokenCache()
+_listener = None
+_reconnect_task = None
+
+
+def invalidate_token(value: str) -> None:
+    """Вызывать после того, как токен помечен is_valid = FALSE или удалён."""
+    token_cache.invalidate(value)
+
+
+def invalidate_user_tokens(user_id: int) -> None:
+    token_cache.invalidate_user(user_id)
+
+
+def _on_token_notify(conn, pid, channel, payload):
+    token_cache.invalidate(payload)
+
+
+async def _connect_listener() -> None:
+    global _listener
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        await conn.add_listener(TOKEN_CHANNEL, _on_token_notify)
+    except BaseException:
+        await conn.close()
+        raise
+    conn.add_termination_listener(_on_listener_lost)
+    # пока соединение не слушало, уведомления могли потеряться
+    token_cache.clear()
+    _listener = conn
+
+
+def _on_listener_lost(conn) -> None:
+    global _listener, _reconnect_task
+    if _listener is not conn:
+        return  # закрыто в stop_token_listener
+    _listener = None
+    # до переподключения отзывы не доходят: записи живут не дольше ttl, как без LISTEN
+    token_cache.clear()
+    _reconnect_task = asyncio.get_running_loop().create_task(_reconnect())
+
+
+async def _reconnect() -> None:
+    global _reconnect_task
+    delay = 0.5
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            await _connect_listener()
+            break
+        except (OSError, asyncpg.PostgresError):
+            delay = min(delay * 2, LISTEN_RETRY_MAX)
+    _reconnect_task = None
+
+
+async def start_token_listener():
+    """
+    Держит отдельное от пула соединение с LISTEN на TOKEN_CHANNEL: отзыв токена любым
+    процессом сразу убирает его из кэша, а не через ttl. Оборванное соединение
+    переподключается в фоне.
+    """
+    if _listener is not None or _reconnect_task is not None:
+        return
+    await _connect_listener()
+
+
+async def stop_token_listener():
+    global _listener, _reconnect_task
+    task, _reconnect_task = _reconnect_task, None
+    if task is not None:
+        task.cancel()
+    conn, _listener = _listener, None
+    if conn is not None:
+        await conn.close()
+    token_cache.clear()
+
 
 async def get_user_by_token(authorization: str | None = Header(None)):
     if not authorization:
@@ -7,6 +148,10 @@ async def get_user_by_token(authorization: str | None = Header(None)):
     if not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Invalid Authorization header")
     token_value = authorization[7:]
+    user = token_cache.get(token_value)
+    if user is not None:
+        return user
+    version = token_cache.version
     pool = await get_pool()
     async with pool.acquire() as conn:
         row = await conn.fetchrow(
@@ -14,4 +159,6 @@ async def get_user_by_token(authorization: str | None = Header(None)):
         )
     if not row:
         raise HTTPException(status_code=401, detail="Invalid token")
-    return {"id": row["id"], "name": row["name"]}
+    user = {"id": row["id"], "name": row["name"]}
+    token_cache.put(token_value, user, version)
+    return user
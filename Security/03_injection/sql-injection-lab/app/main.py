@@ -1,9 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Path
+from fastapi import FastAPI, Depends, HTTPException, Query, Path, Response
 from typing import Annotated, Any
+from datetime import datetime
 from .db import get_pool, close_pool
-from .auth import get_user_by_token
+from .auth import get_user_by_token, start_token_listener, stop_token_listener
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
+import base64
 import hashlib
 import secrets
 
@@ -13,7 +15,9 @@ pool = None
 async def lifespan(app: FastAPI):
     global pool
     pool = await get_pool()
+    await start_token_listener()
     yield
+    await stop_token_listener()
     pool = None
     await close_pool()
 
@@ -40,17 +44,54 @@ async def auth_token(body: AuthRequest):
             token = token_row["value"]
         return {"token": token}
 
+# orders.id — SERIAL (int4): больший id в курсоре — ошибка клиента, а не 500 от базы
+ORDER_ID_MAX = 2**31 - 1
+
+def encode_cursor(created_at: datetime, order_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{order_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, order_id = raw.split("|")
+        created_at = datetime.fromisoformat(created_at)
+        # orders.created_at — TIMESTAMP без зоны, сравнивать с aware-значением asyncpg не даст
+        if created_at.tzinfo is not None:
+            raise ValueError(created_at)
+        order_id = int(order_id)
+        if not 1 <= order_id <= ORDER_ID_MAX:
+            raise ValueError(order_id)
+        return created_at, order_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/orders")
 async def list_orders(
     user: Annotated[dict[str, Any], Depends(get_user_by_token)],
+    response: Response,
     limit,
-    offset
+    offset,
+    cursor: Annotated[str | None, Query(max_length=128)] = None,
 ):
+    """
+    Заказы пользователя, новые первыми. Следующую страницу лучше запрашивать по курсору
+    из заголовка X-Next-Cursor с offset=0: она продолжается от (created_at, id) последней
+    строки предыдущей (индекс orders_user_created_id), и база не просматривает пропущенные
+    строки. offset по-прежнему применяется — уже после курсора. Пустая страница приходит без курсора.
+    """
     global pool
+    after = ""
+    if cursor is not None:
+        # курсор разобран в datetime и int: в запрос попадают только проверенные значения
+        created_at, order_id = decode_cursor(cursor)
+        after = f" AND (created_at, id) < ('{created_at.isoformat()}', {order_id})"
     async with pool.acquire() as conn:
         rows = await conn.fetch(
-            f"SELECT id, user_id, created_at FROM orders WHERE user_id = {user["id"]} ORDER BY created_at DESC LIMIT {limit} OFFSET {offset}"
+            f"SELECT id, user_id, created_at FROM orders WHERE user_id = {user["id"]}{after} ORDER BY created_at DESC, id DESC LIMIT {limit} OFFSET {offset}"
         )
+    if rows:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
     return [{"id": r["id"], "user_id": r["user_id"], "created_at": r["created_at"].isoformat()} for r in rows]
 
 @app.get("/orders/{order_id}")
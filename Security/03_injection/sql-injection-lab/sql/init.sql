@@ -15,6 +15,9 @@ CREATE TABLE orders (
   created_at TIMESTAMP NOT NULL DEFAULT now()
 );
 
+-- под keyset-пагинацию GET /orders: WHERE user_id = $1 AND (created_at, id) < (...) ORDER BY created_at DESC, id DESC
+CREATE INDEX orders_user_created_id ON orders (user_id, created_at DESC, id DESC);
+
 CREATE TABLE goods (
   id SERIAL PRIMARY KEY,
   name TEXT NOT NULL,
@@ -30,6 +33,20 @@ CREATE TABLE tokens (
   is_valid BOOLEAN NOT NULL DEFAULT TRUE
 );
 
+-- приложение кэширует token -> user (app/auth.py); при отзыве токена сообщаем ему значение
+CREATE OR REPLACE FUNCTION notify_token_invalidated() RETURNS trigger AS $$
+BEGIN
+  IF OLD.is_valid AND (TG_OP = 'DELETE' OR NOT NEW.is_valid OR NEW.value <> OLD.value OR NEW.user_id <> OLD.user_id) THEN
+    PERFORM pg_notify('token_invalidated', OLD.value);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tokens_invalidated
+  AFTER UPDATE OR DELETE ON tokens
+  FOR EACH ROW EXECUTE FUNCTION notify_token_invalidated();
+
 INSERT INTO users (id, name, password_hash) VALUES
   (1, 'alice', 'e6d21a69daa4a8ebca755c1d5808b85b'),
   (2, 'bob', '530c81a25a362791fff683c511c2edd8'),
@@ -0,0 +1,40 @@
+from datetime import datetime
+from asgi_lifespan import LifespanManager
+import pytest
+from httpx import ASGITransport, AsyncClient
+from app.main import app, encode_cursor
+
+
+@pytest.fixture
+async def client():
+    async with LifespanManager(app):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            yield ac
+
+
+@pytest.mark.asyncio
+async def test_orders_keyset_pagination(client):
+    """
+    Постраничный обход по курсору из X-Next-Cursor: все заказы пользователя ровно по одному разу,
+    пустая страница приходит без курсора. Некорректный курсор отклоняется с 400.
+    """
+    headers = {"Authorization": "Bearer secrettokenAlice"}
+    seen = []
+    params = {"limit": 1, "offset": 0}
+    while True:
+        r = await client.get("/orders", headers=headers, params=params)
+        assert r.status_code == 200
+        page = r.json()
+        assert len(page) <= 1 and all(o["user_id"] == 1 for o in page)
+        seen += [o["id"] for o in page]
+        if "x-next-cursor" not in r.headers:
+            break
+        params = {"limit": 1, "offset": 0, "cursor": r.headers["x-next-cursor"]}
+    assert sorted(seen) == [1, 4]
+
+    too_big = encode_cursor(datetime(2024, 1, 1), 2**31)
+    for cursor in ("' OR '1'='1", too_big):
+        r = await client.get("/orders", headers=headers, params={"limit": 1, "offset": 0, "cursor": cursor})
+        assert r.status_code == 400
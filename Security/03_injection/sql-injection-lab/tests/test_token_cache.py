@@ -0,0 +1,95 @@
+import asyncio
+from app import auth
+from app.auth import TokenCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_cache_expires_after_ttl():
+    clock = Clock()
+    cache = TokenCache(maxsize=10, ttl=5, clock=clock)
+    cache.put("secrettokenAlice", {"id": 1, "name": "alice"})
+    assert cache.get("secrettokenAlice") == {"id": 1, "name": "alice"}
+    clock.now = 5
+    assert cache.get("secrettokenAlice") is None
+    assert len(cache) == 0
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(maxsize=2, ttl=60, clock=Clock())
+    cache.put("a", {"id": 1, "name": "alice"})
+    cache.put("b", {"id": 2, "name": "bob"})
+    cache.get("a")
+    cache.put("c", {"id": 3, "name": "eva"})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_token_cache_invalidation():
+    """
+    Отозванный токен пропадает из кэша сразу, а ответ запроса, начатого до отзыва, не кэшируется.
+    """
+    cache = TokenCache(maxsize=10, ttl=60, clock=Clock())
+    cache.put("a", {"id": 1, "name": "alice"})
+    cache.put("a2", {"id": 1, "name": "alice"})
+    cache.put("b", {"id": 2, "name": "bob"})
+    cache.invalidate("b")
+    assert cache.get("b") is None
+    cache.invalidate_user(1)
+    assert len(cache) == 0
+
+    version = cache.version
+    cache.invalidate("a")
+    cache.put("a", {"id": 1, "name": "alice"}, version)
+    assert cache.get("a") is None
+
+
+class FakeConn:
+    """Как asyncpg.Connection: close() и обрыв вызывают termination listeners."""
+
+    def __init__(self):
+        self.listeners = []
+        self.closed = False
+
+    async def add_listener(self, channel, cb):
+        pass
+
+    def add_termination_listener(self, cb):
+        self.listeners.append(cb)
+
+    def terminate(self):
+        self.closed = True
+        for cb in self.listeners:
+            cb(self)
+
+    async def close(self):
+        self.terminate()
+
+
+async def test_token_listener_reconnects_and_clears_cache(monkeypatch):
+    conns = []
+
+    async def connect(dsn):
+        conns.append(FakeConn())
+        return conns[-1]
+
+    monkeypatch.setattr(auth.asyncpg, "connect", connect)
+    await auth.start_token_listener()
+    try:
+        auth.token_cache.put("a", {"id": 1, "name": "alice"})
+        conns[0].terminate()
+        # уведомления об отзыве могли пропасть, пока соединения не было
+        assert auth.token_cache.get("a") is None
+        task = auth._reconnect_task
+        assert task is not None
+        await asyncio.wait_for(task, 5)
+        assert len(conns) == 2 and auth._listener is conns[1]
+    finally:
+        await auth.stop_token_listener()
+    assert conns[1].closed and auth._listener is None and auth._reconnect_task is None